@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+# Throughput and latency benchmark for the connector against local fakes of OBS and the Specter backend.
+# Results are written as JSON so runs of different versions can be compared with --compare
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+benchmark_dir = os.path.dirname(os.path.abspath(__file__))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the OBS Connector event pipeline")
+    parser.add_argument('--rate', type=float, default=500, help="OBS events per second")
+    parser.add_argument('--duration', type=float, default=10, help="seconds of streaming per run")
+    parser.add_argument('--warmup', type=float, default=2, help="seconds of streaming before measuring")
+    parser.add_argument('--event-type', default='InputMuteStateChanged')
+    parser.add_argument('--command-rate', type=float, default=5, help="Specter OBS commands per second, 0 to skip")
+    parser.add_argument('--response-delay-ms', type=float, default=20, help="simulated SEND_OBS_EVENT response time")
+    parser.add_argument('--payload-format', choices=('form', 'json', 'gzip'), default='form')
+    parser.add_argument('--transport', choices=('https', 'socket'), default='https')
+    parser.add_argument('--batch-max-events', type=int)
+    parser.add_argument('--batch-max-delay-ms', type=int)
+    parser.add_argument('--rate-limit', type=float, help="SEND_OBS_EVENT deliveries per second, 0 for no limit")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="results JSON of an earlier run to compare against")
+    return parser.parse_args()
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo_dir, stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Resident memory of this process in MB, from /proc where available
+def current_rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+# Signal stand-in that only remembers the last value
+class Signal:
+    def __init__(self):
+        self.value = None
+
+    def emit(self, value):
+        self.value = value
+
+# Keeps the last value per OBS instance
+class InstanceSignal:
+    def __init__(self):
+        self.values = {}
+
+    def emit(self, instance, value):
+        self.values[instance] = value
+
+class BenchStatus:
+    def __init__(self):
+        self.connection_status = Signal()
+        self.connection_detail = Signal()
+        self.obs_connection_status = Signal()
+        self.obs_connection_detail = Signal()
+        self.obs_instance_status = InstanceSignal()
+        self.obs_instance_detail = InstanceSignal()
+        self.api_key_status = Signal()
+
+def configure(connector, args, obs_port, api_url):
+    settings = connector.load_settings()
+    settings.set('API', 'apiKey', 'benchmark')
+    settings.set('API', 'api_url', api_url)
+    settings.set('API', 'websocket_url', api_url)
+    settings.set('API', 'payload_format', args.payload_format)
+    settings.set('API', 'event_transport', args.transport)
+    if args.batch_max_events is not None:
+        settings.set('API', 'batch_max_events', str(args.batch_max_events))
+    if args.batch_max_delay_ms is not None:
+        settings.set('API', 'batch_max_delay_ms', str(args.batch_max_delay_ms))
+    if args.rate_limit is not None:
+        settings.set('API', 'rate_limit_per_second', str(args.rate_limit))
+    settings.set('OBS', 'server_ip', '127.0.0.1')
+    settings.set('OBS', 'server_port', str(obs_port))
+    settings.set('OBS', 'server_password', '')
+    if 'LOGGING' not in settings:
+        settings.add_section('LOGGING')
+    # Per-event log lines would measure the disk, not the pipeline
+    settings.set('LOGGING', 'events', 'WARNING')
+    settings.set('LOGGING', 'commands', 'WARNING')
+    connector.save_settings(settings)
+
+async def post_json(url, payload, timeout):
+    import aiohttp
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        async with session.post(url, json=payload) as response:
+            return await response.json()
+
+async def wait_connected(status, need_socket, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if status.obs_connection_status.value and (not need_socket or status.connection_status.value):
+            return True
+        await asyncio.sleep(0.1)
+    return False
+
+async def benchmark(connector, args, control_url):
+    status = BenchStatus()
+    stop = asyncio.Event()
+    connector_task = asyncio.ensure_future(connector.run_connector(status, stop))
+    try:
+        if not await wait_connected(status, need_socket=bool(args.command_rate) or args.transport == 'socket'):
+            raise RuntimeError(f"Connector did not connect: OBS {status.obs_connection_detail.value!r}, Specter {status.connection_detail.value!r}")
+        run = {'rate': args.rate, 'event_type': args.event_type, 'command_rate': args.command_rate}
+        if args.warmup:
+            await post_json(control_url, dict(run, duration=args.warmup), args.warmup + 60)
+        cpu_started = time.process_time()
+        wall_started = time.perf_counter()
+        report = await post_json(control_url, dict(run, duration=args.duration), args.duration + 60)
+        wall = time.perf_counter() - wall_started
+        cpu = time.process_time() - cpu_started
+    finally:
+        stop.set()
+        await connector_task
+    snapshot = connector.metrics.snapshot()
+    return {
+        'events_per_second': report['events_delivered'] / wall,
+        'events_sent': report['events_sent'],
+        'events_delivered': report['events_delivered'],
+        'posts': report['posts'],
+        'delivery_latency': report['delivery_latency'],
+        'commands_ok': report['commands_ok'],
+        'commands_failed': report['commands_failed'],
+        'command_latency': report['command_latency'],
+        'cpu_seconds': cpu,
+        'cpu_percent': 100 * cpu / wall,
+        'rss_mb': current_rss_mb(),
+        'peak_rss_mb': peak_rss_mb(),
+        'events_shed': {priority: snapshot['gauges'].get(f"forwarder_shed_{priority}", 0) for priority in connector.PRIORITY_CLASSES},
+        'connector_latency': snapshot['histograms'],
+    }
+
+def print_results(results, previous=None):
+    def row(label, value, key=None, unit=''):
+        if value is None:
+            text = '-'
+        elif isinstance(value, int):
+            text = f"{value:,}"
+        else:
+            text = f"{value:,.2f}"
+        line = f"{label:<28}{text}{unit}"
+        if previous is not None and key is not None:
+            old = previous
+            for part in key.split('.'):
+                old = old.get(part) if isinstance(old, dict) else None
+            if old and value is not None:
+                line += f"  (was {old:,.2f}, {100 * (value - old) / old:+.1f}%)"
+        print(line)
+    row("Events/sec", results['events_per_second'], 'events_per_second')
+    row("Events sent", results['events_sent'])
+    row("Events delivered", results['events_delivered'])
+    row("SEND_OBS_EVENT deliveries", results['posts'], 'posts')
+    for name in ('p50_ms', 'p90_ms', 'p99_ms'):
+        row(f"Delivery latency {name[:-3]}", results['delivery_latency'][name], f"delivery_latency.{name}", ' ms')
+    if results['commands_ok'] or results['commands_failed']:
+        row("Commands ok", results['commands_ok'])
+        row("Commands failed", results['commands_failed'])
+        for name in ('p50_ms', 'p99_ms'):
+            row(f"Command latency {name[:-3]}", results['command_latency'][name], f"command_latency.{name}", ' ms')
+    for priority, shed in results.get('events_shed', {}).items():
+        row(f"Shed {priority}", shed)
+    row("CPU", results['cpu_percent'], 'cpu_percent', ' %')
+    row("RSS", results['rss_mb'], 'rss_mb', ' MB')
+    row("Peak RSS", results['peak_rss_mb'], 'peak_rss_mb', ' MB')
+
+def main():
+    args = parse_args()
+    # The connector keeps its settings, log and spool under this directory instead of the user's
+    os.environ['SPECTER_OBS_CONNECTOR_DIR'] = tempfile.mkdtemp(prefix='specter-bench-')
+    sys.path.insert(0, repo_dir)
+    sys.path.insert(0, benchmark_dir)
+    import connector
+    import fakes
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    backend = context.Process(target=fakes.run_process, args=('127.0.0.1', 0, 0, args.response_delay_ms / 1000, sender), daemon=True)
+    backend.start()
+    try:
+        obs_port, api_port = receiver.recv()
+        fake_url = f"http://127.0.0.1:{api_port}"
+        configure(connector, args, obs_port, fake_url)
+        results = asyncio.run(benchmark(connector, args, f"{fake_url}/bench/run"))
+    finally:
+        backend.terminate()
+        backend.join()
+    output = {
+        'version': connector.VERSION,
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'results': results,
+    }
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)['results']
+    print(f"{connector.NAME} {connector.VERSION} ({output['revision']}), {args.rate:g} events/s for {args.duration:g}s")
+    print_results(results, previous)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+import asyncio
+import json
+import time
+from aiohttp import web
+import socketio
+
+# Local stand-ins for OBS and the Specter backend, used by the benchmark harness
+
+def percentiles(samples, points=(0.5, 0.9, 0.99)):
+    samples = sorted(samples)
+    if not samples:
+        return {f"p{int(point * 100)}_ms": None for point in points}
+    return {f"p{int(point * 100)}_ms": samples[min(len(samples) - 1, int(point * len(samples)))] * 1000 for point in points}
+
+# obs-websocket v5 server without authentication that answers the state requests the connector
+# makes on connect and can stream synthetic events at a fixed rate
+class FakeOBSServer:
+    scenes = ['Scene 1', 'Scene 2']
+    inputs = ['Camera', 'Microphone', 'Desktop Audio', 'Overlay']
+
+    def __init__(self):
+        self.clients = []
+        self.sent = 0
+        self.requests = 0
+        self.current_scene = self.scenes[0]
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/', self.handle)
+        return app
+
+    async def handle(self, request):
+        ws = web.WebSocketResponse(protocols=('obswebsocket.json',))
+        await ws.prepare(request)
+        await ws.send_json({'op': 0, 'd': {'obsWebSocketVersion': '5.5.0', 'rpcVersion': 1}})
+        identify = json.loads((await ws.receive()).data)
+        if identify.get('op') != 1:
+            await ws.close(code=4007)
+            return ws
+        await ws.send_json({'op': 2, 'd': {'negotiatedRpcVersion': 1}})
+        self.clients.append(ws)
+        try:
+            async for message in ws:
+                data = json.loads(message.data)
+                if data['op'] == 6:
+                    await ws.send_json({'op': 7, 'd': self.respond(data['d'])})
+                elif data['op'] == 8:
+                    results = [self.respond(request_data) for request_data in data['d']['requests']]
+                    await ws.send_json({'op': 9, 'd': {'requestId': data['d']['requestId'], 'results': results}})
+        finally:
+            self.clients.remove(ws)
+        return ws
+
+    def respond(self, request):
+        self.requests += 1
+        request_type = request['requestType']
+        request_data = request.get('requestData') or {}
+        if request_type == 'GetSceneList':
+            response = {
+                'currentProgramSceneName': self.current_scene, 'currentPreviewSceneName': None,
+                'scenes': [{'sceneName': name, 'sceneUuid': f"scene-{index}"} for index, name in enumerate(self.scenes)],
+            }
+        elif request_type == 'GetInputList':
+            response = {'inputs': [{'inputName': name, 'inputUuid': f"input-{index}", 'inputKind': 'bench'} for index, name in enumerate(self.inputs)]}
+        elif request_type == 'GetSceneItemList':
+            response = {'sceneItems': [
+                {'sceneItemId': index + 1, 'sourceName': name, 'sourceUuid': f"input-{index}", 'sceneItemEnabled': True}
+                for index, name in enumerate(self.inputs)
+            ]}
+        elif request_type == 'GetSourceFilterList':
+            response = {'filters': []}
+        elif request_type == 'SetCurrentProgramScene':
+            self.current_scene = request_data.get('sceneName', self.current_scene)
+            response = {}
+        else:
+            response = {}
+        return {
+            'requestType': request_type, 'requestId': request.get('requestId'),
+            'requestStatus': {'result': True, 'code': 100}, 'responseData': response,
+        }
+
+    # Events carry their sequence number and send time so the fake API can measure delivery latency
+    async def stream(self, rate, duration, event_type):
+        interval = 1 / rate
+        started = time.perf_counter()
+        sequence = 0
+        while True:
+            due = started + sequence * interval
+            now = time.perf_counter()
+            if now - started >= duration:
+                break
+            if due > now:
+                await asyncio.sleep(due - now)
+            event = {'op': 5, 'd': {'eventType': event_type, 'eventIntent': 1, 'eventData': {
+                'inputName': self.inputs[sequence % len(self.inputs)],
+                'inputMuted': bool(sequence % 2),
+                'benchSequence': sequence,
+                'benchSentAt': time.time(),
+            }}}
+            for ws in list(self.clients):
+                await ws.send_json(event)
+            sequence += 1
+            self.sent += 1
+
+# SEND_OBS_EVENT and checkkey endpoints, records when each benchmark event arrives
+class FakeSpecterAPI:
+    def __init__(self, response_delay=0.0):
+        self.response_delay = response_delay
+        self.requests = 0
+        self.events = 0
+        self.sequences = set()
+        self.latencies = []
+
+    def add_routes(self, app):
+        app.router.add_get('/checkkey', self.check_key)
+        app.router.add_post('/SEND_OBS_EVENT', self.send_obs_event)
+
+    async def check_key(self, request):
+        return web.json_response({'status': 'Valid API Key'})
+
+    async def send_obs_event(self, request):
+        received = time.time()
+        # aiohttp undoes Content-Encoding: gzip before the body is read
+        if request.content_type == 'application/json':
+            body = json.loads(await request.read())
+        else:
+            body = json.loads((await request.post())['data'])
+        self.record(body, received)
+        if self.response_delay:
+            await asyncio.sleep(self.response_delay)
+        return web.json_response({'status': 'ok'})
+
+    # Shared by the HTTPS endpoint and the socket.io event, requests counts deliveries over both
+    def record(self, body, received):
+        for event in body if isinstance(body, list) else [body]:
+            datain = event.get('datain') or {}
+            self.events += 1
+            if 'benchSequence' in datain:
+                self.sequences.add(datain['benchSequence'])
+                self.latencies.append(received - datain['benchSentAt'])
+        self.requests += 1
+
+    def reset(self):
+        self.requests = 0
+        self.events = 0
+        self.sequences.clear()
+        self.latencies.clear()
+
+# socket.io server standing in for websocket.botofthespecter.com, acknowledges SEND_OBS_EVENT emits
+# into the fake API's records and sends OBS commands, timing their acks
+class FakeSpecterSocket:
+    def __init__(self, api):
+        self.api = api
+        self.server = socketio.AsyncServer(async_mode='aiohttp')
+        self.clients = set()
+        self.latencies = []
+        self.errors = 0
+        self.server.on('connect', self.on_connect)
+        self.server.on('disconnect', self.on_disconnect)
+        self.server.on('SEND_OBS_EVENT', self.on_send_obs_event)
+
+    def attach(self, app):
+        self.server.attach(app)
+
+    # Like the real server, connections and emits without an api_key are refused
+    async def on_connect(self, sid, environ, auth=None):
+        if not (auth or {}).get('api_key'):
+            return False
+        self.clients.add(sid)
+
+    async def on_disconnect(self, sid, reason=None):
+        self.clients.discard(sid)
+
+    async def on_send_obs_event(self, sid, data):
+        if not data.get('api_key'):
+            return {'status': 'error', 'message': 'missing api_key'}
+        self.api.record(json.loads(data['data']), time.time())
+        return {'status': 'ok'}
+
+    async def send_commands(self, rate, duration, scenes):
+        interval = 1 / rate
+        started = time.perf_counter()
+        sequence = 0
+        pending = []
+        while time.perf_counter() - started < duration:
+            due = started + sequence * interval
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            for sid in list(self.clients):
+                pending.append(asyncio.ensure_future(self.send_command(sid, {'sceneName': scenes[sequence % len(scenes)]})))
+            sequence += 1
+        await asyncio.gather(*pending)
+
+    async def send_command(self, sid, data):
+        sent = time.perf_counter()
+        try:
+            reply = await self.server.call('OBS_SWITCH_SCENE', data, to=sid, timeout=10)
+        except Exception:
+            self.errors += 1
+            return
+        if isinstance(reply, dict) and reply.get('status') == 'ok':
+            self.latencies.append(time.perf_counter() - sent)
+        else:
+            self.errors += 1
+
+# Runs all three fakes and a small control API the harness uses to start a run and collect results
+class FakeBackend:
+    def __init__(self, host='127.0.0.1', obs_port=0, api_port=0, response_delay=0.0):
+        self.host = host
+        self.obs_port = obs_port
+        self.api_port = api_port
+        self.obs = FakeOBSServer()
+        self.api = FakeSpecterAPI(response_delay)
+        self.socket = FakeSpecterSocket(self.api)
+        self.runners = []
+
+    async def start(self):
+        obs_runner = web.AppRunner(self.obs.app(), access_log=None)
+        api_app = web.Application()
+        self.api.add_routes(api_app)
+        self.socket.attach(api_app)
+        api_app.router.add_post('/bench/run', self.run)
+        api_app.router.add_get('/bench/status', self.status)
+        api_runner = web.AppRunner(api_app, access_log=None)
+        for runner in (obs_runner, api_runner):
+            await runner.setup()
+            self.runners.append(runner)
+        obs_site = web.TCPSite(obs_runner, self.host, self.obs_port)
+        api_site = web.TCPSite(api_runner, self.host, self.api_port)
+        await obs_site.start()
+        await api_site.start()
+        self.obs_port = obs_site._server.sockets[0].getsockname()[1]
+        self.api_port = api_site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        for runner in self.runners:
+            await runner.cleanup()
+
+    async def status(self, request):
+        return web.json_response({'obs_clients': len(self.obs.clients), 'socket_clients': len(self.socket.clients)})
+
+    # Stream events and commands for the requested duration, then report what arrived
+    async def run(self, request):
+        params = await request.json()
+        self.api.reset()
+        self.socket.latencies.clear()
+        self.socket.errors = 0
+        self.obs.sent = 0
+        work = [self.obs.stream(params['rate'], params['duration'], params['event_type'])]
+        if params.get('command_rate'):
+            work.append(self.socket.send_commands(params['command_rate'], params['duration'], self.obs.scenes))
+        await asyncio.gather(*work)
+        # Give the connector time to flush its last batch
+        deadline = time.perf_counter() + params.get('drain', 5)
+        while len(self.api.sequences) < self.obs.sent and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+        return web.json_response({
+            'events_sent': self.obs.sent,
+            'events_delivered': len(self.api.sequences),
+            'posts': self.api.requests,
+            'delivery_latency': percentiles(self.api.latencies),
+            'commands_ok': len(self.socket.latencies),
+            'commands_failed': self.socket.errors,
+            'command_latency': percentiles(self.socket.latencies),
+        })
+
+async def serve(host, obs_port, api_port, response_delay, ready=None):
+    backend = FakeBackend(host, obs_port, api_port, response_delay)
+    await backend.start()
+    if ready is not None:
+        ready.send((backend.obs_port, backend.api_port))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await backend.stop()
+
+# Entry point for the harness, runs in a child process so the fakes do not share the connector's CPU
+def run_process(host, obs_port, api_port, response_delay, ready):
+    try:
+        asyncio.run(serve(host, obs_port, api_port, response_delay, ready))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the fake OBS and Specter servers on their own")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--obs-port', type=int, default=4455)
+    parser.add_argument('--api-port', type=int, default=8080)
+    parser.add_argument('--response-delay-ms', type=float, default=0)
+    args = parser.parse_args()
+    print(f"Fake OBS on ws://{args.host}:{args.obs_port}, fake Specter API and socket.io on http://{args.host}:{args.api_port}")
+    try:
+        asyncio.run(serve(args.host, args.obs_port, args.api_port, args.response_delay_ms / 1000))
+    except KeyboardInterrupt:
+        pass
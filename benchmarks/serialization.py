@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import timeit
+import urllib.parse
+from datetime import datetime
+
+# Per-event CPU cost of building the SEND_OBS_EVENT body, the original path against encode_events
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def sample_events(count):
+    events = []
+    for index in range(count):
+        events.append({'name': 'InputMuteStateChanged', 'datain': {
+            'inputName': f"Input {index % 8}", 'inputUuid': f"6f1c2a3e-0000-4000-8000-{index:012d}",
+            'inputMuted': bool(index % 2), 'timestamp': datetime.now(),
+        }})
+        events.append({'name': 'SceneItemTransformChanged', 'datain': {
+            'sceneName': 'Scene 1', 'sceneItemId': index % 16,
+            'sceneItemTransform': {
+                'alignment': 5, 'boundsType': 'OBS_BOUNDS_NONE', 'height': 1080.0, 'width': 1920.0,
+                'positionX': index * 1.5, 'positionY': 0.0, 'rotation': 0.0, 'scaleX': 1.0, 'scaleY': 1.0,
+                'cropLeft': 0, 'cropRight': 0, 'cropTop': 0, 'cropBottom': 0,
+            },
+        }})
+    return events[:count]
+
+# The serialization done before encode_events existed: json.dumps with the default separators and a form field
+def original_payload(connector, events_data):
+    body = events_data[0] if len(events_data) == 1 else events_data
+    return urllib.parse.urlencode({'data': json.dumps(body, default=connector.custom_serializer)}).encode('ascii')
+
+def measure(function, events_data, repeat):
+    timer = timeit.Timer(lambda: function(events_data), timer=time.process_time)
+    loops, _ = timer.autorange()
+    best = min(timer.repeat(repeat, loops)) / loops
+    return best / len(events_data) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark of OBS event serialization")
+    parser.add_argument('--batch-sizes', default='1,20,100')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    os.environ.setdefault('SPECTER_OBS_CONNECTOR_DIR', tempfile.mkdtemp(prefix='specter-bench-'))
+    sys.path.insert(0, repo_dir)
+    import connector
+    orjson = connector.orjson
+    variants = [("original (json + form)", lambda events: original_payload(connector, events))]
+    def stdlib_variant(payload_format):
+        def encode(events):
+            connector.orjson = None
+            try:
+                return connector.build_event_payload(connector.encode_events(events), payload_format)[0]
+            finally:
+                connector.orjson = orjson
+        return encode
+    for payload_format in connector.PAYLOAD_FORMATS:
+        variants.append((f"stdlib {payload_format}", stdlib_variant(payload_format)))
+        if orjson is not None:
+            variants.append((f"orjson {payload_format}", lambda events, payload_format=payload_format: connector.build_event_payload(connector.encode_events(events), payload_format)[0]))
+    if orjson is None:
+        print("orjson is not installed, only the stdlib encoder is measured")
+    for batch_size in (int(size) for size in args.batch_sizes.split(',')):
+        events_data = sample_events(batch_size)
+        print(f"\nBatch of {batch_size} events")
+        print(f"{'':<26}{'us/event':>10}{'bytes/event':>13}")
+        baseline = None
+        for label, function in variants:
+            cost = measure(function, events_data, args.repeat)
+            size = len(function(events_data)) / batch_size
+            baseline = baseline or cost
+            print(f"{label:<26}{cost:>10.2f}{size:>13.0f}  {baseline / cost:5.1f}x")
+
+if __name__ == '__main__':
+    main()
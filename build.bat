@@ -2,6 +2,8 @@
 set name=Specter OBS Connector
 title %name%
 set name="%name%"
+set headless_name="Specter OBS Connector Headless"
 set ico=assets/icons/app-icon.ico
 @echo on
-pyinstaller -F -w --icon=%ico% --name=%name% main.py
+pyinstaller -F -w --icon=%ico% --add-data "%ico%;assets/icons" --name=%name% main.py
+pyinstaller -F --icon=%ico% --name=%headless_name% headless.py
@@ -0,0 +1,2938 @@
+import os
+import base64
+import bisect
+import collections
+import atexit
+import hashlib
+import configparser
+import gc
+import asyncio
+import gzip
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import struct
+import sys
+import threading
+import time
+import tracemalloc
+import urllib.parse
+from datetime import datetime
+
+# Optional faster JSON encoder for forwarded events
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Paths for storage, SPECTER_OBS_CONNECTOR_DIR points a test or benchmark run at its own settings and logs
+user_settings_dir = os.path.join(os.path.expanduser("~"), 'AppData', 'Local', 'YourStreamingTools', 'BotOfTheSpecter')
+settings_dir = os.environ.get('SPECTER_OBS_CONNECTOR_DIR') or user_settings_dir
+os.makedirs(settings_dir, exist_ok=True)
+settings_path = os.path.join(settings_dir, 'OBSConnectorSettings.ini')
+log_path = os.path.join(settings_dir, 'OBSConnectorLog.txt')
+spool_dir = os.path.join(settings_dir, 'EventSpool')
+diagnostics_dir = os.path.join(settings_dir, 'Diagnostics')
+
+# Specter endpoints, overridden by api_url and websocket_url in the [API] section
+DEFAULT_API_URL = 'https://api.botofthespecter.com'
+DEFAULT_WEBSOCKET_URL = 'wss://websocket.botofthespecter.com'
+
+# Log categories whose verbosity can be set on their own in the [LOGGING] section
+event_log = logging.getLogger('connector.events')
+command_log = logging.getLogger('connector.commands')
+LOG_CATEGORIES = {'events': event_log, 'commands': command_log}
+LOG_TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# One JSON object per line for tools that parse the log
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'category': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, separators=(',', ':'), default=str)
+
+# Callers only put records on a queue, a single listener thread writes the rotating log file
+class LogPipeline:
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backup_count=5):
+        self.queue = queue.SimpleQueue()
+        self.file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        self.file_handler.setFormatter(logging.Formatter(LOG_TEXT_FORMAT))
+        self.handlers = [self.file_handler]
+        self.listener = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        root = logging.getLogger()
+        root.setLevel(logging.INFO)
+        root.addHandler(logging.handlers.QueueHandler(self.queue))
+        self.restart()
+        atexit.register(self.stop)
+
+    def restart(self):
+        with self.lock:
+            if self.listener is not None:
+                self.listener.stop()
+            self.listener = logging.handlers.QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+            self.listener.start()
+
+    # Extra outputs such as the headless console also run on the listener thread
+    def add_handler(self, handler):
+        self.handlers.append(handler)
+        self.restart()
+
+    def stop(self):
+        with self.lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+
+    def apply_settings(self, config):
+        try:
+            level = config.get('LOGGING', 'level', fallback='INFO').upper()
+            logging.getLogger().setLevel(level)
+            for name, logger in LOG_CATEGORIES.items():
+                category_level = config.get('LOGGING', name, fallback='').upper()
+                logger.setLevel(category_level or logging.NOTSET)
+            self.file_handler.maxBytes = max(1, config.getint('LOGGING', 'max_size_mb', fallback=10)) * 1024 * 1024
+            self.file_handler.backupCount = max(0, config.getint('LOGGING', 'backup_count', fallback=5))
+        except ValueError as e:
+            logging.error(f"Invalid logging settings: {e}")
+        json_lines = config.get('LOGGING', 'format', fallback='text').lower() == 'json'
+        self.file_handler.setFormatter(JsonLinesFormatter() if json_lines else logging.Formatter(LOG_TEXT_FORMAT))
+
+    def on_settings_changed(self, config, changed):
+        if 'LOGGING' in changed:
+            self.apply_settings(config)
+
+log_pipeline = LogPipeline(log_path)
+log_pipeline.start()
+
+# Globals
+# Created on first use by get_specter_socket, socketio and aiohttp are slow to import
+specterSocket = None
+VERSION = "1.0"
+NAME = "BotOftheSpecter OBS Connector"
+
+# Startup milestones in milliseconds, measured from when the entry point started
+class StartupTimer:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = {}
+
+    def mark(self, name):
+        if name in self.marks:
+            return
+        self.marks[name] = (time.perf_counter() - self.start) * 1000
+        logging.info(f"Startup timing: {name} at {self.marks[name]:.0f} ms")
+
+    def report(self):
+        return ", ".join(f"{name} {elapsed:.0f} ms" for name, elapsed in self.marks.items())
+
+startup_timer = StartupTimer()
+
+# Prometheus style latency histogram in seconds, recent samples are kept for the live percentiles
+class LatencyHistogram:
+    bounds = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, recent=1024):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = collections.deque(maxlen=recent)
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.recent.append(seconds)
+
+    def percentile(self, q):
+        samples = sorted(self.recent)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+# Counters and latency histograms for each pipeline stage, cheap enough to update per event.
+# Collectors add values that other components already count, read when a snapshot is taken
+class Metrics:
+    def __init__(self):
+        self.started = time.time()
+        self.counters = {}
+        self.histograms = {}
+        self.collectors = []
+
+    def inc(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, seconds):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def gauges(self):
+        values = {}
+        for collector in self.collectors:
+            try:
+                values.update(collector())
+            except Exception as e:
+                logging.error(f"Metrics collector error: {e}")
+        return values
+
+    # Plain values for the UI, latencies in milliseconds
+    def snapshot(self):
+        histograms = {}
+        for name, histogram in list(self.histograms.items()):
+            p50, p99 = histogram.percentile(0.5), histogram.percentile(0.99)
+            histograms[name] = {
+                'count': histogram.count,
+                'p50_ms': None if p50 is None else p50 * 1000,
+                'p99_ms': None if p99 is None else p99 * 1000,
+            }
+        return {'uptime': time.time() - self.started, 'counters': dict(self.counters), 'gauges': self.gauges(), 'histograms': histograms}
+
+    # Prometheus text exposition format 0.0.4
+    def prometheus_text(self):
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            lines += [f"# TYPE specter_{name} counter", f"specter_{name} {value}"]
+        for name, value in sorted(self.gauges().items()):
+            lines += [f"# TYPE specter_{name} gauge", f"specter_{name} {value}"]
+        for name, histogram in sorted(list(self.histograms.items())):
+            lines.append(f"# TYPE specter_{name} histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.bounds, histogram.counts):
+                cumulative += count
+                lines.append(f'specter_{name}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'specter_{name}_bucket{{le="+Inf"}} {histogram.count}')
+            lines.append(f"specter_{name}_sum {histogram.sum}")
+            lines.append(f"specter_{name}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+# Level names as written by the text and JSON log formats, used by the log viewer filters
+log_level_pattern = re.compile(r'(?: - |"level":")(DEBUG|INFO|WARNING|ERROR|CRITICAL)(?: - |")')
+
+# Reads the end of the log file and then follows it by offset, without loading the whole file
+class LogTail:
+    block_size = 64 * 1024
+    # Further behind than this and following would replay more than the viewer keeps, reload the tail instead
+    max_follow_bytes = 4 * 1024 * 1024
+
+    def __init__(self, path, max_lines=1000):
+        self.path = path
+        self.max_lines = max_lines
+        self.offset = 0
+        self.identity = None
+        self.min_level = 0
+        self.text = ''
+
+    def set_filter(self, level=None, text=''):
+        self.min_level = logging.getLevelName(level) if level else 0
+        self.text = text.lower()
+
+    def matches(self, line):
+        if self.text and self.text not in line.lower():
+            return False
+        if self.min_level:
+            match = log_level_pattern.search(line)
+            if match is None or logging.getLevelName(match.group(1)) < self.min_level:
+                return False
+        return True
+
+    def filter_lines(self, parts):
+        lines = []
+        for part in parts:
+            line = part.decode('utf-8', errors='replace').rstrip('\r')
+            if line and self.matches(line):
+                lines.append(line)
+        return lines
+
+    # Last max_lines matching lines, found by reading backwards from the end of the file
+    def tail(self):
+        with open(self.path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_dev, stat.st_ino)
+            end = f.seek(0, os.SEEK_END)
+            position = end
+            lines = []
+            pending = b''
+            trailing = None
+            while position > 0 and len(lines) < self.max_lines:
+                size = min(self.block_size, position)
+                position -= size
+                f.seek(position)
+                pending = f.read(size) + pending
+                if trailing is None:
+                    # A line still being written is picked up by the next follow, a long one can start several blocks back
+                    newline = pending.rfind(b'\n')
+                    if newline < 0:
+                        continue
+                    trailing = pending[newline + 1:]
+                    pending = pending[:newline]
+                parts = pending.split(b'\n')
+                # The first line may carry on in the block before this one
+                pending = parts.pop(0) if position > 0 else b''
+                lines = self.filter_lines(parts) + lines
+            if trailing is None:
+                # No newline anywhere, the whole file is one unfinished line
+                trailing = pending
+        self.offset = end - len(trailing)
+        return lines[-self.max_lines:]
+
+    # Lines appended since the last read, replace is True when the caller should discard what it shows
+    def follow(self):
+        with open(self.path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            identity = (stat.st_dev, stat.st_ino)
+            end = f.seek(0, os.SEEK_END)
+            if identity != self.identity or end < self.offset:
+                # Rotated or truncated, start over from the top of the new file
+                self.identity = identity
+                self.offset = 0
+                replace = True
+            else:
+                replace = False
+            if end - self.offset > self.max_follow_bytes:
+                return self.tail(), True
+            if end == self.offset:
+                return [], replace
+            f.seek(self.offset)
+            parts = f.read(end - self.offset).split(b'\n')
+            trailing = parts.pop()
+            self.offset = end - len(trailing)
+            return self.filter_lines(parts)[-self.max_lines:], replace
+
+# Rewrite the INI file for the current version, keeping every stored section
+def rebuild_settings_file(config):
+    stored_sections = {name: dict(config.items(name)) for name in config.sections() if name != 'VERSION'}
+    os.remove(settings_path)
+    config = configparser.ConfigParser()
+    config.add_section('VERSION')
+    config.set('VERSION', 'version', VERSION)
+    for name in ('API', 'OBS'):
+        stored_sections.setdefault(name, {})
+    for name, values in stored_sections.items():
+        config.add_section(name)
+        for key, value in values.items():
+            config.set(name, key, value)
+    with open(settings_path, 'w') as f:
+        config.write(f)
+    return config
+
+# Read settings from the INI file, upgrading the file when the stored version differs
+def read_settings_file():
+    config = configparser.ConfigParser()
+    if os.path.exists(settings_path):
+        config.read(settings_path)
+        if 'VERSION' in config:
+            stored_version = config['VERSION'].get('version', None)
+            if stored_version != VERSION:
+                config = rebuild_settings_file(config)
+        else:
+            config = rebuild_settings_file(config)
+    else:
+        config.add_section('VERSION')
+        config.set('VERSION', 'version', VERSION)
+        config.add_section('API')
+        config.set('API', 'apiKey', '')
+        config.set('API', 'batch_max_events', '1')
+        config.set('API', 'batch_max_delay_ms', '250')
+        config.set('API', 'queue_max_events', '1000')
+        config.set('API', 'coalesce_window_ms', '100')
+        config.set('API', 'coalesce_events', ','.join(DEFAULT_COALESCE_EVENTS))
+        config.set('API', 'critical_events', ','.join(DEFAULT_CRITICAL_EVENTS))
+        config.set('API', 'low_priority_events', ','.join(DEFAULT_LOW_PRIORITY_EVENTS))
+        config.set('API', 'queue_max_low_events', '200')
+        config.set('API', 'low_priority_shed_backlog', '200')
+        config.set('API', 'rate_limit_per_second', '50')
+        config.set('API', 'rate_limit_burst', '50')
+        config.set('API', 'spool_max_mb', '50')
+        config.set('API', 'spool_retry_seconds', '5')
+        config.set('API', 'payload_format', PAYLOAD_FORM)
+        config.set('API', 'event_transport', EVENT_TRANSPORT_HTTPS)
+        config.set('API', 'socket_ack_timeout_ms', '5000')
+        config.set('API', 'key_check_timeout_seconds', '10')
+        config.set('API', 'key_check_ttl_seconds', '3600')
+        config.add_section('OBS')
+        config.set('OBS', 'server_ip', 'localhost')
+        config.set('OBS', 'server_port', '4455')
+        config.set('OBS', 'server_password', '')
+        config.set('OBS', 'state_resync_seconds', '300')
+        config.add_section('LOGGING')
+        config.set('LOGGING', 'level', 'INFO')
+        config.set('LOGGING', 'format', 'text')
+        config.set('LOGGING', 'max_size_mb', '10')
+        config.set('LOGGING', 'backup_count', '5')
+        for name in LOG_CATEGORIES:
+            config.set('LOGGING', name, 'INFO')
+        config.add_section('CAPTURE')
+        config.set('CAPTURE', 'path', '')
+        config.add_section('METRICS')
+        config.set('METRICS', 'http_host', '127.0.0.1')
+        config.set('METRICS', 'http_port', '0')
+        config.add_section('FILTERS')
+        config.set('FILTERS', 'default_action', ROUTE_FORWARD)
+        for name, events, conditions, action in DEFAULT_EVENT_RULES:
+            config.add_section(f'RULE {name}')
+            config.set(f'RULE {name}', 'events', events)
+            config.set(f'RULE {name}', 'when', conditions)
+            config.set(f'RULE {name}', 'action', action)
+        with open(settings_path, 'w') as f:
+            config.write(f)
+    return config
+
+# In-memory settings, the INI file is only parsed again when its mtime or size changes
+class SettingsStore:
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.config = None
+        self.signature = None
+        self.sections = {}
+        self.last_check = 0
+        self.subscribers = []
+        self.lock = threading.RLock()
+
+    def file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    # Returns the names of the sections whose values differ from the last snapshot
+    def update_snapshot(self):
+        sections = {section: dict(self.config.items(section)) for section in self.config.sections()}
+        changed = {name for name in set(sections) | set(self.sections) if sections.get(name) != self.sections.get(name)}
+        self.sections = sections
+        return changed
+
+    def get(self):
+        changed = set()
+        with self.lock:
+            now = time.monotonic()
+            if self.config is None or now - self.last_check >= self.check_interval:
+                self.last_check = now
+                if self.config is None or self.file_signature() != self.signature:
+                    self.config = read_settings_file()
+                    self.signature = self.file_signature()
+                    changed = self.update_snapshot()
+            config = self.config
+        if changed:
+            self.notify(changed)
+        return config
+
+    # Write through to the INI file and keep the cached copy in step with it
+    def save(self, config):
+        with self.lock:
+            with open(self.path, 'w') as configfile:
+                config.write(configfile)
+            self.config = config
+            self.signature = self.file_signature()
+            self.last_check = time.monotonic()
+            changed = self.update_snapshot()
+        if changed:
+            self.notify(changed)
+
+    # Callbacks receive (config, changed_sections) and may be called from any thread
+    def subscribe(self, callback):
+        with self.lock:
+            self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def notify(self, changed):
+        with self.lock:
+            subscribers = list(self.subscribers)
+            config = self.config
+        for callback in subscribers:
+            try:
+                callback(config, changed)
+            except Exception as e:
+                logging.error(f"Settings subscriber error: {e}")
+
+settings_store = SettingsStore(settings_path)
+settings_store.subscribe(log_pipeline.on_settings_changed)
+
+# Load settings, served from memory after the first read
+def load_settings():
+    return settings_store.get()
+
+def specter_api_url(path):
+    return f"{load_settings().get('API', 'api_url', fallback=DEFAULT_API_URL).rstrip('/')}/{path}"
+
+# Save settings to the INI file
+def save_settings(config):
+    settings_store.save(config)
+
+# Event routing destinations
+ROUTE_FORWARD = 'forward'
+ROUTE_LOG = 'log'
+ROUTE_DROP = 'drop'
+ROUTE_ACTIONS = (ROUTE_FORWARD, ROUTE_LOG, ROUTE_DROP)
+
+# Used when the settings file has no RULE sections: (name, events, when, action)
+DEFAULT_EVENT_RULES = [
+    ('scene-item-visibility', 'SceneItemEnableStateChanged', 'sceneItemEnabled', ROUTE_LOG),
+]
+
+# obs-websocket v5 EventSubscription categories and the events each one carries
+OBS_EVENT_CATEGORIES = {
+    1 << 0: ('ExitStarted', 'CustomEvent'),
+    1 << 1: ('CurrentSceneCollectionChanging', 'CurrentSceneCollectionChanged', 'SceneCollectionListChanged',
+             'CurrentProfileChanging', 'CurrentProfileChanged', 'ProfileListChanged'),
+    1 << 2: ('SceneCreated', 'SceneRemoved', 'SceneNameChanged', 'CurrentProgramSceneChanged',
+             'CurrentPreviewSceneChanged', 'SceneListChanged'),
+    1 << 3: ('InputCreated', 'InputRemoved', 'InputNameChanged', 'InputSettingsChanged', 'InputMuteStateChanged',
+             'InputVolumeChanged', 'InputAudioBalanceChanged', 'InputAudioSyncOffsetChanged',
+             'InputAudioTracksChanged', 'InputAudioMonitorTypeChanged'),
+    1 << 4: ('CurrentSceneTransitionChanged', 'CurrentSceneTransitionDurationChanged', 'SceneTransitionStarted',
+             'SceneTransitionEnded', 'SceneTransitionVideoEnded'),
+    1 << 5: ('SourceFilterListReindexed', 'SourceFilterCreated', 'SourceFilterRemoved', 'SourceFilterNameChanged',
+             'SourceFilterSettingsChanged', 'SourceFilterEnableStateChanged'),
+    1 << 6: ('StreamStateChanged', 'RecordStateChanged', 'RecordFileChanged', 'ReplayBufferStateChanged',
+             'VirtualcamStateChanged', 'ReplayBufferSaved'),
+    1 << 7: ('SceneItemCreated', 'SceneItemRemoved', 'SceneItemListReindexed', 'SceneItemEnableStateChanged',
+             'SceneItemLockStateChanged', 'SceneItemSelected'),
+    1 << 8: ('MediaInputPlaybackStarted', 'MediaInputPlaybackEnded', 'MediaInputActionTriggered'),
+    1 << 9: ('VendorEvent',),
+    1 << 10: ('StudioModeStateChanged', 'ScreenshotSaved'),
+}
+# High-volume events have their own bits and are only requested when a rule names them
+OBS_HIGH_VOLUME_EVENTS = {
+    'InputVolumeMeters': 1 << 16,
+    'InputActiveStateChanged': 1 << 17,
+    'InputShowStateChanged': 1 << 18,
+    'SceneItemTransformChanged': 1 << 19,
+}
+OBS_EVENT_SUBSCRIPTIONS_DEFAULT = sum(OBS_EVENT_CATEGORIES)
+
+# Conditions are "field", "!field", "field == value" or "field != value", separated by ";"
+def parse_rule_conditions(text):
+    conditions = []
+    for part in text.split(';'):
+        part = part.strip()
+        if not part:
+            continue
+        for operator in ('!=', '=='):
+            if operator in part:
+                field, value = part.split(operator, 1)
+                conditions.append((field.strip(), operator, value.strip()))
+                break
+        else:
+            if part.startswith('!'):
+                conditions.append((part[1:].strip(), 'missing', None))
+            else:
+                conditions.append((part, 'exists', None))
+    return tuple(conditions)
+
+def format_rule_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+def rule_conditions_match(conditions, datain):
+    for field, operator, expected in conditions:
+        if operator == 'exists':
+            if field not in datain:
+                return False
+        elif operator == 'missing':
+            if field in datain:
+                return False
+        elif field not in datain:
+            if operator == '==':
+                return False
+        elif (format_rule_value(datain[field]) == expected) != (operator == '=='):
+            return False
+    return True
+
+# Compiles the FILTERS and RULE sections into a per-event-name dispatch table
+class EventRouter:
+    def __init__(self):
+        self.table = None
+        self.subscriptions = OBS_EVENT_SUBSCRIPTIONS_DEFAULT
+        self.lock = threading.Lock()
+
+    def parse_rules(self, config):
+        rules = []
+        rule_sections = [name for name in config.sections() if name.startswith('RULE ')]
+        if not rule_sections:
+            for name, events, conditions, action in DEFAULT_EVENT_RULES:
+                rules.append((frozenset([events]), parse_rule_conditions(conditions), action))
+            return rules
+        for section in rule_sections:
+            action = config.get(section, 'action', fallback=ROUTE_FORWARD).strip().lower()
+            if action not in ROUTE_ACTIONS:
+                logging.error(f"Event rule \"{section[5:]}\" has unknown action \"{action}\", rule skipped.")
+                continue
+            events = [name.strip() for name in config.get(section, 'events', fallback='*').split(',') if name.strip()]
+            event_names = None if '*' in events or not events else frozenset(events)
+            rules.append((event_names, parse_rule_conditions(config.get(section, 'when', fallback='')), action))
+        return rules
+
+    def load(self, config):
+        default_action = config.get('FILTERS', 'default_action', fallback=ROUTE_FORWARD).strip().lower()
+        if default_action not in ROUTE_ACTIONS:
+            logging.error(f"Unknown default event action \"{default_action}\", forwarding all events.")
+            default_action = ROUTE_FORWARD
+        rules = self.parse_rules(config)
+        # Rules keep their file order, wildcard rules are merged into every named list
+        named = set()
+        for event_names, conditions, action in rules:
+            if event_names:
+                named.update(event_names)
+        wildcard = tuple((conditions, action) for event_names, conditions, action in rules if event_names is None)
+        dispatch = {
+            name: tuple((conditions, action) for event_names, conditions, action in rules if event_names is None or name in event_names)
+            for name in named
+        }
+        with self.lock:
+            self.table = (dispatch, wildcard, default_action)
+            self.subscriptions = self.build_subscriptions(dispatch, wildcard, default_action)
+
+    def ensure_loaded(self):
+        if self.table is None:
+            self.load(load_settings())
+
+    def on_settings_changed(self, config, changed):
+        if 'FILTERS' in changed or any(name.startswith('RULE ') for name in changed):
+            self.load(config)
+
+    # An event can be dropped at the source only when every path for it ends in an unconditional drop
+    def may_deliver(self, rules, default_action):
+        for conditions, action in rules:
+            if action != ROUTE_DROP:
+                return True
+            if not conditions:
+                return False
+        return default_action != ROUTE_DROP
+
+    def build_subscriptions(self, dispatch, wildcard, default_action):
+        mask = 0
+        for bit, event_names in OBS_EVENT_CATEGORIES.items():
+            if any(self.may_deliver(dispatch.get(name, wildcard), default_action) for name in event_names):
+                mask |= bit
+        for name, bit in OBS_HIGH_VOLUME_EVENTS.items():
+            if name in dispatch and self.may_deliver(dispatch[name], default_action):
+                mask |= bit
+        return mask
+
+    def get_subscriptions(self):
+        self.ensure_loaded()
+        return self.subscriptions
+
+    def route(self, name, datain):
+        self.ensure_loaded()
+        dispatch, wildcard, default_action = self.table
+        for conditions, action in dispatch.get(name, wildcard):
+            if not conditions or rule_conditions_match(conditions, datain):
+                return action
+        return default_action
+
+event_router = EventRouter()
+settings_store.subscribe(event_router.on_settings_changed)
+
+# OBS instances: [OBS] is the main instance, every [OBS name] section adds another one
+DEFAULT_OBS_INSTANCE = 'main'
+
+def obs_instance_section(instance):
+    return 'OBS' if instance == DEFAULT_OBS_INSTANCE else f'OBS {instance}'
+
+def obs_instance_names(config):
+    return [DEFAULT_OBS_INSTANCE] + [name[4:].strip() for name in config.sections() if name.startswith('OBS ') and name[4:].strip()]
+
+# Get the settings for the OBS WebSocket Server
+async def obs_websocket_settings(instance=DEFAULT_OBS_INSTANCE):
+    settings = load_settings()
+    section = obs_instance_section(instance)
+    server_ip = settings.get(section, 'server_ip', fallback='localhost')
+    server_port = settings.get(section, 'server_port', fallback='4455')
+    server_password = settings.get(section, 'server_password', fallback='')
+    return server_ip, server_port, server_password
+
+# API key validation results, True for valid, False for rejected and None when the server could not be reached
+class APIKeyValidator:
+    def __init__(self, invalid_ttl=60):
+        self.invalid_ttl = invalid_ttl
+        # sha256 of the key -> (result, monotonic expiry), the raw key is never kept
+        self.cache = {}
+        self.pending = {}
+
+    @staticmethod
+    def key_hash(api_key):
+        return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+    # Valid results are also stored in the settings file so a restart skips the network
+    def cached(self, api_key):
+        digest = self.key_hash(api_key)
+        entry = self.cache.get(digest)
+        if entry is not None:
+            result, expires = entry
+            if time.monotonic() < expires:
+                return result
+            del self.cache[digest]
+        stored = load_settings().get('API', 'key_validated', fallback='')
+        stored_hash, _, valid_until = stored.partition(':')
+        try:
+            remaining = float(valid_until) - time.time()
+        except ValueError:
+            return None
+        if stored_hash == digest and remaining > 0:
+            self.cache[digest] = (True, time.monotonic() + remaining)
+            return True
+        return None
+
+    def remember(self, api_key, result):
+        digest = self.key_hash(api_key)
+        settings = load_settings()
+        if result:
+            ttl = max(0, settings.getint('API', 'key_check_ttl_seconds', fallback=3600))
+            self.cache[digest] = (True, time.monotonic() + ttl)
+            if ttl and 'API' in settings:
+                settings.set('API', 'key_validated', f"{digest}:{time.time() + ttl:.0f}")
+                save_settings(settings)
+        else:
+            self.cache[digest] = (False, time.monotonic() + self.invalid_ttl)
+
+    # Check a key against the Specter API, concurrent checks of the same key share one request
+    async def check(self, api_key, timeout=None, use_cache=True):
+        if not api_key:
+            return False
+        if use_cache:
+            result = self.cached(api_key)
+            if result is not None:
+                logging.info(f"API Key Validation: cached result {'valid' if result else 'invalid'}")
+                return result
+        if timeout is None:
+            timeout = max(1, load_settings().getint('API', 'key_check_timeout_seconds', fallback=10))
+        digest = self.key_hash(api_key)
+        task = self.pending.get(digest)
+        if task is None:
+            task = asyncio.ensure_future(self.request(api_key, timeout))
+            self.pending[digest] = task
+            task.add_done_callback(lambda done: self.pending.pop(digest, None))
+        # Shielded so one caller cancelling does not abort the check for the others
+        return await asyncio.shield(task)
+
+    async def request(self, api_key, timeout):
+        import aiohttp
+        try:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+                async with session.get(specter_api_url('checkkey'), params={'api_key': api_key}) as response:
+                    if response.status != 200:
+                        logging.error(f"API Key Validation: HTTP {response.status}")
+                        return None
+                    data = await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logging.error(f"API Key Validation Error: {e or type(e).__name__}")
+            return None
+        logging.info(f"API Key Validation: {data}")
+        result = data.get('status') == 'Valid API Key'
+        self.remember(api_key, result)
+        return result
+
+api_key_validator = APIKeyValidator()
+
+# Check the stored key once at startup, alongside opening the connections
+async def check_stored_api_key(status):
+    api_key = load_settings().get('API', 'apiKey', fallback='')
+    if not api_key:
+        status.api_key_status.emit("Not set")
+        return
+    result = await api_key_validator.check(api_key)
+    if result is None:
+        status.api_key_status.emit("Could not be checked, Specter API unreachable")
+    elif result:
+        status.api_key_status.emit("Valid")
+    else:
+        logging.error("The stored API Key was rejected by the Specter API.")
+        status.api_key_status.emit("Invalid, please enter a new key")
+
+# Check whether a TCP port accepts connections, used to spot OBS opening its WebSocket server
+async def probe_tcp(host, port, timeout=0.25):
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+# Exponential backoff with jitter for reconnecting, reset once a connection has stayed up
+class ReconnectScheduler:
+    def __init__(self, name, base_delay=1.0, max_delay=60.0, stable_after=30.0, probe_interval=0.25, metric=None):
+        self.name = name
+        self.metric = metric
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stable_after = stable_after
+        self.probe_interval = probe_interval
+        self.attempts = 0
+        self.down_since = None
+        self.connected_since = None
+        self.last_reconnect_time = None
+
+    def connected(self):
+        now = time.monotonic()
+        if self.down_since is not None:
+            self.last_reconnect_time = now - self.down_since
+            logging.info(f"{self.name} reconnected after {self.attempts} attempts in {self.last_reconnect_time:.1f}s")
+            if self.metric:
+                metrics.observe(f"{self.metric}_reconnect_seconds", self.last_reconnect_time)
+        self.down_since = None
+        self.connected_since = now
+
+    def disconnected(self):
+        now = time.monotonic()
+        if self.connected_since is not None and self.metric:
+            metrics.inc(f"{self.metric}_disconnects_total")
+        if self.connected_since is not None and now - self.connected_since >= self.stable_after:
+            self.attempts = 0
+        self.connected_since = None
+        if self.down_since is None:
+            self.down_since = now
+
+    # Full-range jitter on the upper half keeps many connectors from retrying in lockstep
+    def next_delay(self):
+        delay = min(self.max_delay, self.base_delay * (2 ** self.attempts))
+        self.attempts += 1
+        return random.uniform(delay / 2, delay)
+
+    # Short status text for the UI
+    def describe(self, delay=None):
+        if self.connected_since is not None:
+            if self.last_reconnect_time is None:
+                return ""
+            return f"Reconnected in {self.last_reconnect_time:.1f}s"
+        if delay is None:
+            return f"Attempt {self.attempts}"
+        return f"Attempt {self.attempts}, retrying in {delay:.1f}s"
+
+    # Wait out the delay, returning early when wake is set or when the probed port starts accepting connections
+    async def wait(self, delay, wake=None, probe=None):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + delay
+        # A port that is already open (for example a wrong password) gains nothing from probing
+        if probe is not None and await probe_tcp(*probe):
+            probe = None
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            step = min(remaining, self.probe_interval) if probe is not None else remaining
+            if wake is not None:
+                try:
+                    await asyncio.wait_for(wake.wait(), step)
+                    self.attempts = 0
+                    return
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(step)
+            if probe is not None and await probe_tcp(*probe):
+                logging.info(f"{self.name} port {probe[0]}:{probe[1]} is accepting connections, reconnecting.")
+                return
+
+# WebSocket connection event handler
+async def specter_websocket(specter_thread):
+    global specter_status
+    specter_status = specter_thread
+    specterSocket = get_specter_socket()
+    import socketio
+    specter_websocket_uri = load_settings().get('API', 'websocket_url', fallback=DEFAULT_WEBSOCKET_URL)
+    reconnect = ReconnectScheduler("Specter WebSocket", base_delay=1, max_delay=60, metric="specter")
+    while True:
+        try:
+            metrics.inc("specter_connect_attempts_total")
+            connect_started = time.perf_counter()
+            # The server authenticates the socket by the same api_key the HTTPS endpoints take
+            api_key = load_settings().get('API', 'apiKey', fallback='')
+            await specterSocket.connect(specter_websocket_uri, auth={'api_key': api_key})
+            metrics.observe("specter_connect_seconds", time.perf_counter() - connect_started)
+            startup_timer.mark('Specter connected')
+            reconnect.connected()
+            specter_thread.connection_status.emit(True)
+            specter_thread.connection_detail.emit(reconnect.describe())
+            event_forwarder.request_replay()
+            # Shielded so cancelling this loop on shutdown leaves the socket intact for a clean disconnect
+            await asyncio.shield(specterSocket.wait())
+            logging.error("SpecterWebSocket Connection lost")
+            specter_thread.connection_status.emit(False)
+        except socketio.exceptions.ConnectionError as ConnectionError:
+            logging.error(f"SpecterWebSocket ConnectionError Error: {ConnectionError}")
+            specter_thread.connection_status.emit(False)
+        except Exception as e:
+            logging.error(f"SpecterWebSocket Error: {e}")
+            specter_thread.connection_status.emit(False)
+        reconnect.disconnected()
+        delay = reconnect.next_delay()
+        specter_thread.connection_detail.emit(reconnect.describe(delay))
+        await reconnect.wait(delay)
+
+# Errors raised by the OBS WebSocket client
+class OBSConnectionFailure(Exception):
+    pass
+
+class OBSRequestError(Exception):
+    def __init__(self, request_type, status):
+        self.request_type = request_type
+        self.code = status.get('code')
+        self.comment = status.get('comment', '')
+        super().__init__(f"{request_type} failed ({self.code}): {self.comment}")
+
+# asyncio obs-websocket v5 client, requests are matched to responses by requestId so many can be in flight
+class OBSWebSocketClient:
+    def __init__(self, host, port, password='', on_event=None, event_subscriptions=OBS_EVENT_SUBSCRIPTIONS_DEFAULT, request_timeout=10, heartbeat=3):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.on_event = on_event
+        self.event_subscriptions = event_subscriptions
+        self.request_timeout = request_timeout
+        # aiohttp pings every heartbeat seconds and closes the socket when the pong does not come back
+        self.heartbeat = heartbeat
+        self.session = None
+        self.ws = None
+        self.receive_task = None
+        self.pending = {}
+        self.request_id = 0
+        self.server_version = None
+        self.closed = asyncio.Event()
+        self.closed.set()
+
+    @property
+    def connected(self):
+        return self.ws is not None and not self.ws.closed and not self.closed.is_set()
+
+    def build_auth_string(self, salt, challenge):
+        secret = base64.b64encode(hashlib.sha256((self.password + salt).encode('utf-8')).digest())
+        return base64.b64encode(hashlib.sha256(secret + challenge.encode('utf-8')).digest()).decode('utf-8')
+
+    async def connect(self):
+        import aiohttp
+        self.session = aiohttp.ClientSession()
+        try:
+            self.ws = await asyncio.wait_for(
+                self.session.ws_connect(f"ws://{self.host}:{self.port}", protocols=('obswebsocket.json',), heartbeat=self.heartbeat),
+                self.request_timeout)
+            hello = await self.receive_handshake(0)
+            self.server_version = hello.get('obsWebSocketVersion')
+            identify = {'rpcVersion': 1, 'eventSubscriptions': self.event_subscriptions}
+            authentication = hello.get('authentication')
+            if authentication:
+                identify['authentication'] = self.build_auth_string(authentication['salt'], authentication['challenge'])
+            await self.send_message(1, identify)
+            await self.receive_handshake(2)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            await self.disconnect()
+            raise OBSConnectionFailure(str(e) or type(e).__name__) from e
+        except (ValueError, KeyError, TypeError) as e:
+            # A handshake message that is not JSON or lacks the salt or challenge
+            await self.disconnect()
+            raise OBSConnectionFailure(f"Invalid handshake: {e}") from e
+        except BaseException:
+            await self.disconnect()
+            raise
+        self.closed.clear()
+        self.receive_task = asyncio.create_task(self.receive_loop())
+
+    async def receive_handshake(self, op):
+        import aiohttp
+        message = await asyncio.wait_for(self.ws.receive(), self.request_timeout)
+        if message.type != aiohttp.WSMsgType.TEXT:
+            # OBS closes with 4009 when the password is wrong
+            raise OBSConnectionFailure(f"Connection closed during handshake (code {self.ws.close_code})")
+        data = json.loads(message.data)
+        if data.get('op') != op:
+            raise OBSConnectionFailure(f"Unexpected handshake message: {data}")
+        return data.get('d', {})
+
+    async def send_message(self, op, data):
+        await self.ws.send_str(json.dumps({'op': op, 'd': data}))
+
+    async def receive_loop(self):
+        import aiohttp
+        try:
+            async for message in self.ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                try:
+                    data = json.loads(message.data)
+                except ValueError as e:
+                    logging.error(f"obsWebSocket Invalid message: {e}")
+                    continue
+                op = data.get('op')
+                d = data.get('d', {})
+                if op == 5:
+                    self.dispatch_event(d)
+                elif op in (7, 9):
+                    future = self.pending.pop(d.get('requestId'), None)
+                    if future is not None and not future.done():
+                        future.set_result(d)
+        finally:
+            self.closed.set()
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(OBSConnectionFailure("Connection to OBS closed"))
+            self.pending.clear()
+
+    def dispatch_event(self, d):
+        if self.on_event is None:
+            return
+        try:
+            self.on_event({'name': d.get('eventType'), 'datain': d.get('eventData', {})})
+        except Exception as e:
+            logging.error(f"obsWebSocket Event handler error: {e}")
+
+    async def send_request(self, op, data):
+        if not self.connected:
+            raise OBSConnectionFailure("Not connected to OBS")
+        self.request_id += 1
+        request_id = str(self.request_id)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        data['requestId'] = request_id
+        try:
+            await self.send_message(op, data)
+            return await asyncio.wait_for(future, self.request_timeout)
+        except asyncio.TimeoutError:
+            raise OBSConnectionFailure("Timed out waiting for a response from OBS")
+        finally:
+            self.pending.pop(request_id, None)
+
+    # Send a request and return its responseData, raising OBSRequestError when OBS reports a failure
+    async def call(self, request_type, request_data=None):
+        response = await self.send_request(6, {'requestType': request_type, 'requestData': request_data or {}})
+        status = response.get('requestStatus', {})
+        if not status.get('result'):
+            raise OBSRequestError(request_type, status)
+        return response.get('responseData') or {}
+
+    # Run several requests in one round trip, returns the per-request results in order
+    async def call_batch(self, requests, execution_type=0, halt_on_failure=False):
+        response = await self.send_request(8, {
+            'haltOnFailure': halt_on_failure,
+            'executionType': execution_type,
+            'requests': [{'requestType': request_type, 'requestData': request_data or {}} for request_type, request_data in requests],
+        })
+        return response.get('results', [])
+
+    async def reidentify(self, event_subscriptions):
+        self.event_subscriptions = event_subscriptions
+        if self.connected:
+            await self.send_message(3, {'eventSubscriptions': event_subscriptions})
+            logging.info(f"OBS event subscriptions set to {event_subscriptions}")
+
+    async def wait_closed(self):
+        await self.closed.wait()
+
+    async def disconnect(self):
+        if self.ws is not None and not self.ws.closed:
+            await self.ws.close()
+        if self.receive_task is not None:
+            await asyncio.gather(self.receive_task, return_exceptions=True)
+            self.receive_task = None
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.closed.set()
+
+# OBS event categories the state cache needs, requested whatever the filter rules say
+OBS_STATE_SUBSCRIPTIONS = (1 << 1) | (1 << 2) | (1 << 3) | (1 << 5) | (1 << 7)
+
+# Local mirror of OBS scenes, scene items, inputs and filters, kept current from OBS events
+class OBSStateCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.resync_requested = None
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.ready = False
+            # sceneName -> {'sceneUuid', 'items': {sceneItemId: item}, 'sources': {sourceName: sceneItemId}}
+            self.scenes = {}
+            self.scene_names = {}
+            # inputName -> {'inputUuid', 'inputKind'}
+            self.inputs = {}
+            # sourceName -> {filterName: filterEnabled}
+            self.filters = {}
+            self.program_scene = None
+            self.preview_scene = None
+            self.checksum = None
+
+    # Fill the cache in bulk, item and filter lists each come back in a single RequestBatch
+    async def fetch(self, client):
+        scene_list = await client.call('GetSceneList')
+        input_list = await client.call('GetInputList')
+        scenes = scene_list.get('scenes', [])
+        inputs = input_list.get('inputs', [])
+        state = {
+            'scenes': {}, 'inputs': {}, 'filters': {},
+            'program_scene': scene_list.get('currentProgramSceneName'),
+            'preview_scene': scene_list.get('currentPreviewSceneName'),
+        }
+        for scene in scenes:
+            state['scenes'][scene['sceneName']] = {'sceneUuid': scene.get('sceneUuid'), 'items': {}, 'sources': {}}
+        for obs_input in inputs:
+            state['inputs'][obs_input['inputName']] = {'inputUuid': obs_input.get('inputUuid'), 'inputKind': obs_input.get('inputKind')}
+        if scenes:
+            results = await client.call_batch([('GetSceneItemList', {'sceneName': scene['sceneName']}) for scene in scenes])
+            for scene, result in zip(scenes, results):
+                for item in (result.get('responseData') or {}).get('sceneItems', []):
+                    self.add_scene_item(state['scenes'][scene['sceneName']], item)
+        sources = list(state['scenes']) + list(state['inputs'])
+        if sources:
+            results = await client.call_batch([('GetSourceFilterList', {'sourceName': source}) for source in sources])
+            for source, result in zip(sources, results):
+                filters = (result.get('responseData') or {}).get('filters', [])
+                if filters:
+                    state['filters'][source] = {f['filterName']: f.get('filterEnabled', True) for f in filters}
+        return state
+
+    def add_scene_item(self, scene, item):
+        scene['items'][item['sceneItemId']] = {
+            'sourceName': item.get('sourceName'),
+            'sourceUuid': item.get('sourceUuid'),
+            'sceneItemEnabled': item.get('sceneItemEnabled', True),
+        }
+        scene['sources'][item.get('sourceName')] = item['sceneItemId']
+
+    def state_checksum(self, state):
+        return hashlib.sha1(json.dumps(state, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def apply_state(self, state):
+        with self.lock:
+            self.scenes = state['scenes']
+            self.scene_names = {scene['sceneUuid']: name for name, scene in self.scenes.items() if scene['sceneUuid']}
+            self.inputs = state['inputs']
+            self.filters = state['filters']
+            self.program_scene = state['program_scene']
+            self.preview_scene = state['preview_scene']
+            self.checksum = self.state_checksum(state)
+            self.ready = True
+
+    async def load(self, client):
+        state = await self.fetch(client)
+        self.apply_state(state)
+        logging.info(f"OBS state loaded: {len(self.scenes)} scenes, {len(self.inputs)} inputs")
+
+    # Compare a fresh copy of the OBS state with the cache and replace the cache when they drift apart.
+    # After a scene collection change the state is expected to differ, so that reload is not drift
+    async def resync(self, client, collection_changed=False):
+        state = await self.fetch(client)
+        if collection_changed:
+            logging.info("OBS scene collection changed, state cache reloaded.")
+        elif self.state_checksum(state) != self.snapshot_checksum():
+            logging.error("OBS state cache drifted from OBS, cache reloaded.")
+        self.apply_state(state)
+
+    async def resync_loop(self, client, interval):
+        self.resync_requested = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self.resync_requested.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            # Only a scene collection change requests a resync early
+            collection_changed = self.resync_requested.is_set()
+            self.resync_requested.clear()
+            try:
+                await self.resync(client, collection_changed)
+            except (OBSConnectionFailure, OBSRequestError) as e:
+                logging.error(f"OBS state resync failed: {e}")
+
+    def snapshot_checksum(self):
+        return self.state_checksum(self.snapshot())
+
+    # A copy of the cached state that is safe to read from any thread
+    def snapshot(self):
+        with self.lock:
+            return {
+                'scenes': {name: {'sceneUuid': scene['sceneUuid'], 'items': {item_id: dict(item) for item_id, item in scene['items'].items()},
+                                  'sources': dict(scene['sources'])} for name, scene in self.scenes.items()},
+                'inputs': {name: dict(obs_input) for name, obs_input in self.inputs.items()},
+                'filters': {name: dict(filters) for name, filters in self.filters.items()},
+                'program_scene': self.program_scene,
+                'preview_scene': self.preview_scene,
+            }
+
+    def scene_for(self, datain):
+        name = datain.get('sceneName') or self.scene_names.get(datain.get('sceneUuid'))
+        return name, self.scenes.get(name)
+
+    def scene_item_id(self, scene_name, source_name):
+        scene = self.scenes.get(scene_name)
+        return scene['sources'].get(source_name) if scene else None
+
+    def scene_item_enabled(self, scene_name, scene_item_id):
+        scene = self.scenes.get(scene_name)
+        item = scene['items'].get(scene_item_id) if scene else None
+        return item['sceneItemEnabled'] if item else None
+
+    def filter_enabled(self, source_name, filter_name):
+        return self.filters.get(source_name, {}).get(filter_name)
+
+    # Keep the cache current from an OBS event and add the source name where OBS leaves it out
+    def apply_event(self, name, datain):
+        if name == 'CurrentSceneCollectionChanged' and self.resync_requested is not None:
+            self.resync_requested.set()
+            return
+        handler = self.event_handlers.get(name)
+        if handler is None:
+            return
+        with self.lock:
+            handler(self, datain)
+
+    def on_scene_created(self, datain):
+        self.scenes[datain['sceneName']] = {'sceneUuid': datain.get('sceneUuid'), 'items': {}, 'sources': {}}
+        if datain.get('sceneUuid'):
+            self.scene_names[datain['sceneUuid']] = datain['sceneName']
+
+    def on_scene_removed(self, datain):
+        name, scene = self.scene_for(datain)
+        self.scenes.pop(name, None)
+        self.scene_names.pop(datain.get('sceneUuid'), None)
+        self.filters.pop(name, None)
+
+    def on_scene_name_changed(self, datain):
+        scene = self.scenes.pop(datain['oldSceneName'], None)
+        if scene is not None:
+            self.scenes[datain['sceneName']] = scene
+            if scene['sceneUuid']:
+                self.scene_names[scene['sceneUuid']] = datain['sceneName']
+        self.rename_source(datain['oldSceneName'], datain['sceneName'])
+
+    def on_program_scene_changed(self, datain):
+        self.program_scene = datain.get('sceneName')
+
+    def on_preview_scene_changed(self, datain):
+        self.preview_scene = datain.get('sceneName')
+
+    def on_scene_item_created(self, datain):
+        name, scene = self.scene_for(datain)
+        if scene is not None:
+            self.add_scene_item(scene, datain)
+
+    def on_scene_item_removed(self, datain):
+        name, scene = self.scene_for(datain)
+        if scene is not None:
+            item = scene['items'].pop(datain.get('sceneItemId'), None)
+            if item is not None and scene['sources'].get(item['sourceName']) == datain.get('sceneItemId'):
+                del scene['sources'][item['sourceName']]
+
+    def on_scene_item_enable_state_changed(self, datain):
+        name, scene = self.scene_for(datain)
+        item = scene['items'].get(datain.get('sceneItemId')) if scene else None
+        if item is not None:
+            item['sceneItemEnabled'] = datain.get('sceneItemEnabled')
+            datain.setdefault('sourceName', item['sourceName'])
+
+    def on_input_created(self, datain):
+        self.inputs[datain['inputName']] = {'inputUuid': datain.get('inputUuid'), 'inputKind': datain.get('inputKind')}
+
+    def on_input_removed(self, datain):
+        self.inputs.pop(datain.get('inputName'), None)
+        self.filters.pop(datain.get('inputName'), None)
+
+    def on_input_name_changed(self, datain):
+        obs_input = self.inputs.pop(datain['oldInputName'], None)
+        if obs_input is not None:
+            self.inputs[datain['inputName']] = obs_input
+        self.rename_source(datain['oldInputName'], datain['inputName'])
+
+    # Scene items and filters refer to sources by name
+    def rename_source(self, old_name, new_name):
+        if old_name in self.filters:
+            self.filters[new_name] = self.filters.pop(old_name)
+        for scene in self.scenes.values():
+            scene_item_id = scene['sources'].pop(old_name, None)
+            if scene_item_id is not None:
+                scene['sources'][new_name] = scene_item_id
+                scene['items'][scene_item_id]['sourceName'] = new_name
+
+    def on_filter_created(self, datain):
+        self.filters.setdefault(datain['sourceName'], {})[datain['filterName']] = True
+
+    def on_filter_removed(self, datain):
+        self.filters.get(datain.get('sourceName'), {}).pop(datain.get('filterName'), None)
+
+    def on_filter_name_changed(self, datain):
+        filters = self.filters.get(datain['sourceName'], {})
+        if datain['oldFilterName'] in filters:
+            filters[datain['filterName']] = filters.pop(datain['oldFilterName'])
+
+    def on_filter_enable_state_changed(self, datain):
+        self.filters.setdefault(datain['sourceName'], {})[datain['filterName']] = datain.get('filterEnabled')
+
+    event_handlers = {
+        'SceneCreated': on_scene_created,
+        'SceneRemoved': on_scene_removed,
+        'SceneNameChanged': on_scene_name_changed,
+        'CurrentProgramSceneChanged': on_program_scene_changed,
+        'CurrentPreviewSceneChanged': on_preview_scene_changed,
+        'SceneItemCreated': on_scene_item_created,
+        'SceneItemRemoved': on_scene_item_removed,
+        'SceneItemEnableStateChanged': on_scene_item_enable_state_changed,
+        'InputCreated': on_input_created,
+        'InputRemoved': on_input_removed,
+        'InputNameChanged': on_input_name_changed,
+        'SourceFilterCreated': on_filter_created,
+        'SourceFilterRemoved': on_filter_removed,
+        'SourceFilterNameChanged': on_filter_name_changed,
+        'SourceFilterEnableStateChanged': on_filter_enable_state_changed,
+    }
+
+# State cache per OBS instance
+obs_states = {}
+
+def get_obs_state(instance=DEFAULT_OBS_INSTANCE):
+    state = obs_states.get(instance)
+    if state is None:
+        state = obs_states[instance] = OBSStateCache()
+    return state
+
+# Function to connect to OBS WebSocket server, one call per OBS instance on the shared loop
+async def obs_websocket(obs_thread, instance=DEFAULT_OBS_INSTANCE):
+    loop = asyncio.get_running_loop()
+    section = obs_instance_section(instance)
+    obs_state = get_obs_state(instance)
+    label = "OBS WebSocket" if instance == DEFAULT_OBS_INSTANCE else f"OBS WebSocket ({instance})"
+    # Set when the saved OBS settings change so the connection is rebuilt straight away
+    settings_changed = asyncio.Event()
+    obsSocket = None
+    def update_event_subscriptions():
+        if obsSocket is not None and obsSocket.connected:
+            loop.create_task(obsSocket.reidentify(event_router.get_subscriptions() | OBS_STATE_SUBSCRIPTIONS))
+    def on_settings_changed(config, changed):
+        if loop.is_closed():
+            return
+        if section in changed:
+            loop.call_soon_threadsafe(settings_changed.set)
+        elif 'FILTERS' in changed or any(name.startswith('RULE ') for name in changed):
+            loop.call_soon_threadsafe(update_event_subscriptions)
+    settings_store.subscribe(on_settings_changed)
+    reconnect = ReconnectScheduler(label, base_delay=0.5, max_delay=30, metric="obs")
+    # Events are tagged with the instance they came from before they join the shared stream
+    def on_instance_event(event):
+        on_event(event, instance)
+    try:
+        while True:
+            settings_changed.clear()
+            server_ip, server_port, server_password = await obs_websocket_settings(instance)
+            try:
+                subscriptions = event_router.get_subscriptions() | OBS_STATE_SUBSCRIPTIONS
+                obsSocket = OBSWebSocketClient(server_ip, server_port, server_password, on_event=on_instance_event, event_subscriptions=subscriptions)
+                metrics.inc("obs_connect_attempts_total")
+                connect_started = time.perf_counter()
+                await obsSocket.connect()
+                metrics.observe("obs_connect_seconds", time.perf_counter() - connect_started)
+                logging.info(f"Connected to {label} {obsSocket.server_version} at {server_ip}:{server_port}")
+                startup_timer.mark('OBS connected')
+                reconnect.connected()
+                obs_thread.obs_connection_status.emit(True)
+                obs_thread.obs_connection_detail.emit(reconnect.describe())
+                # Whatever ends the connection, the socket and its receive loop are closed before the next
+                # client is built, otherwise the old receive loop would keep delivering events
+                try:
+                    try:
+                        await obs_state.load(obsSocket)
+                    except OBSRequestError as e:
+                        logging.error(f"OBS state load failed: {e}")
+                    obs_command_executor.attach(obsSocket, instance)
+                    resync_interval = max(10, load_settings().getint(section, 'state_resync_seconds', fallback=300))
+                    await wait_first(obsSocket.wait_closed(), settings_changed.wait(), obs_state.resync_loop(obsSocket, resync_interval))
+                finally:
+                    obs_command_executor.detach(obsSocket, instance)
+                    obs_state.clear()
+                    await obsSocket.disconnect()
+                reconnect.disconnected()
+                if settings_changed.is_set():
+                    logging.info(f"{label} settings changed, reconnecting.")
+                    reconnect.attempts = 0
+                    continue
+                logging.error(f"{label} Connection lost")
+                obs_thread.obs_connection_status.emit(False)
+            except OBSConnectionFailure as ConnectionFailure:
+                logging.error(f"{label} ConnectionFailure: {ConnectionFailure}")
+                obs_thread.obs_connection_status.emit(False)
+                reconnect.disconnected()
+            except Exception as e:
+                logging.error(f"{label} Error: {e}")
+                obs_thread.obs_connection_status.emit(False)
+                reconnect.disconnected()
+            delay = reconnect.next_delay()
+            obs_thread.obs_connection_detail.emit(reconnect.describe(delay))
+            try:
+                probe = (server_ip, int(server_port))
+            except ValueError:
+                probe = None
+            await reconnect.wait(delay, wake=settings_changed, probe=probe)
+    finally:
+        settings_store.unsubscribe(on_settings_changed)
+        if obsSocket is not None:
+            obs_command_executor.detach(obsSocket, instance)
+            obs_state.clear()
+            await obsSocket.disconnect()
+
+# Wait until the first of several awaitables finishes and cancel the rest
+async def wait_first(*aws):
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+# Status for an extra OBS instance, passes its name along with each update
+class OBSInstanceStatus:
+    class Emitter:
+        def __init__(self, signal, instance):
+            self.signal = signal
+            self.instance = instance
+
+        def emit(self, value):
+            self.signal.emit(self.instance, value)
+
+    def __init__(self, status, instance):
+        self.obs_connection_status = self.Emitter(status.obs_instance_status, instance)
+        self.obs_connection_detail = self.Emitter(status.obs_instance_detail, instance)
+
+# Keep one obs_websocket task per configured OBS instance, adding and removing them as the settings change.
+# The main instance reports through the status' obs_connection_* signals, the others through obs_instance_*
+async def obs_instances(status):
+    loop = asyncio.get_running_loop()
+    changed = asyncio.Event()
+    tasks = {}
+    def on_settings_changed(config, sections):
+        if not loop.is_closed() and any(name.startswith('OBS ') for name in sections):
+            loop.call_soon_threadsafe(changed.set)
+    settings_store.subscribe(on_settings_changed)
+    try:
+        while True:
+            changed.clear()
+            wanted = obs_instance_names(load_settings())
+            for instance in [name for name in tasks if name not in wanted]:
+                logging.info(f"OBS instance \"{instance}\" removed")
+                task = tasks.pop(instance)
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                obs_states.pop(instance, None)
+                status.obs_instance_status.emit(instance, False)
+                status.obs_instance_detail.emit(instance, "Removed")
+            for instance in wanted:
+                if instance not in tasks:
+                    instance_status = status if instance == DEFAULT_OBS_INSTANCE else OBSInstanceStatus(status, instance)
+                    tasks[instance] = loop.create_task(obs_websocket(instance_status, instance))
+            await changed.wait()
+    finally:
+        settings_store.unsubscribe(on_settings_changed)
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+# Append-only, segment-based spool for events that could not be delivered
+class EventSpool:
+    segment_pattern = re.compile(r'^segment-(\d+)\.jsonl$')
+
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024, segment_max_bytes=1024 * 1024, fsync_interval=1.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_interval = fsync_interval
+        self.cursor_path = os.path.join(directory, 'cursor')
+        # Segment numbers oldest first, reading always happens in the oldest one
+        self.segments = []
+        self.sizes = {}
+        self.total_bytes = 0
+        self.read_offset = 0
+        self.peek_end = None
+        self.writer = None
+        self.write_segment = None
+        self.dirty = False
+        self.last_fsync = 0
+        self.stats = {'events_spooled': 0, 'events_replayed': 0, 'segments_evicted': 0, 'bytes_evicted': 0}
+        self.open()
+
+    def segment_path(self, segment):
+        return os.path.join(self.directory, f'segment-{segment:08d}.jsonl')
+
+    # Only file names and sizes are read at startup, segment contents are streamed on replay
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        for name in os.listdir(self.directory):
+            match = self.segment_pattern.match(name)
+            if match:
+                segment = int(match.group(1))
+                self.segments.append(segment)
+                self.sizes[segment] = os.path.getsize(os.path.join(self.directory, name))
+        self.segments.sort()
+        self.total_bytes = sum(self.sizes.values())
+        try:
+            with open(self.cursor_path, 'r') as f:
+                segment, offset = (int(value) for value in f.read().split())
+            if self.segments and segment == self.segments[0]:
+                self.read_offset = min(offset, self.sizes[segment])
+        except (OSError, ValueError):
+            pass
+        if self.has_pending():
+            logging.info(f"Resuming OBS event spool: {len(self.segments)} segments, {self.total_bytes} bytes")
+
+    def has_pending(self):
+        if not self.segments:
+            return False
+        return len(self.segments) > 1 or self.read_offset < self.sizes[self.segments[0]]
+
+    def save_cursor(self):
+        segment = self.segments[0] if self.segments else 0
+        temp_path = self.cursor_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(f"{segment} {self.read_offset}")
+        os.replace(temp_path, self.cursor_path)
+
+    def rotate(self):
+        self.close_writer()
+        self.write_segment = self.segments[-1] + 1 if self.segments else 1
+        self.writer = open(self.segment_path(self.write_segment), 'ab')
+        self.segments.append(self.write_segment)
+        self.sizes[self.write_segment] = 0
+
+    def close_writer(self):
+        if self.writer is not None:
+            self.sync(force=True)
+            self.writer.close()
+            self.writer = None
+            self.write_segment = None
+
+    # fsync is batched, at most once per fsync_interval unless forced
+    def sync(self, force=False):
+        if not self.dirty or self.writer is None:
+            return
+        now = time.monotonic()
+        if force or now - self.last_fsync >= self.fsync_interval:
+            os.fsync(self.writer.fileno())
+            self.dirty = False
+            self.last_fsync = now
+
+    def append(self, events_data):
+        lines = []
+        for event_data in events_data:
+            try:
+                lines.append(json.dumps(event_data, default=custom_serializer, separators=(',', ':')))
+            except (TypeError, ValueError) as e:
+                logging.error(f"OBS event could not be spooled: {e}")
+        if not lines:
+            return
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+        if self.writer is None or self.sizes[self.write_segment] >= self.segment_max_bytes:
+            self.rotate()
+        self.writer.write(data)
+        self.writer.flush()
+        self.sizes[self.write_segment] += len(data)
+        self.total_bytes += len(data)
+        self.stats['events_spooled'] += len(lines)
+        self.dirty = True
+        self.sync()
+        self.enforce_limit()
+
+    # Evict whole segments, oldest first, the segment being written is always kept
+    def enforce_limit(self):
+        evicted = False
+        while self.total_bytes > self.max_bytes and len(self.segments) > 1:
+            segment = self.segments.pop(0)
+            size = self.sizes.pop(segment)
+            self.total_bytes -= size
+            self.stats['segments_evicted'] += 1
+            self.stats['bytes_evicted'] += size - self.read_offset
+            self.read_offset = 0
+            self.remove_segment(segment)
+            evicted = True
+        if evicted:
+            logging.error(f"OBS event spool is over its size limit, oldest events evicted: {self.stats}")
+            self.save_cursor()
+
+    def remove_segment(self, segment):
+        try:
+            os.remove(self.segment_path(segment))
+        except OSError as e:
+            logging.error(f"Error removing spool segment {segment}: {e}")
+
+    # Read up to max_events from the front of the spool, commit() marks them delivered
+    def peek(self, max_events):
+        self.peek_end = None
+        if not self.has_pending():
+            return []
+        segment = self.segments[0]
+        offset = self.read_offset
+        events = []
+        with open(self.segment_path(segment), 'rb') as f:
+            f.seek(offset)
+            while len(events) < max_events:
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    # A partial line at the end of a finished segment is a write cut short by a crash
+                    if segment != self.write_segment:
+                        offset = self.sizes[segment]
+                    break
+                offset += len(line)
+                try:
+                    events.append(json.loads(line))
+                except ValueError as e:
+                    logging.error(f"Skipping unreadable spooled OBS event: {e}")
+        self.peek_end = (segment, offset)
+        return events
+
+    def commit(self):
+        if self.peek_end is None or not self.segments or self.segments[0] != self.peek_end[0]:
+            return
+        segment, offset = self.peek_end
+        self.peek_end = None
+        self.read_offset = offset
+        if offset >= self.sizes[segment]:
+            if segment == self.write_segment:
+                self.close_writer()
+            self.segments.pop(0)
+            self.total_bytes -= self.sizes.pop(segment)
+            self.remove_segment(segment)
+            self.read_offset = 0
+        self.save_cursor()
+
+    def close(self):
+        self.close_writer()
+
+# Bursty events where only the latest state matters
+DEFAULT_COALESCE_EVENTS = (
+    'SceneItemTransformChanged', 'InputVolumeChanged', 'InputAudioBalanceChanged',
+    'MediaInputPlaybackStarted', 'MediaInputPlaybackEnded',
+)
+
+# Events for the same scene, input and scene item share a coalescing key
+def coalesce_key(name, datain, instance=None):
+    return (
+        instance,
+        name,
+        datain.get('sceneUuid') or datain.get('sceneName'),
+        datain.get('inputUuid') or datain.get('inputName'),
+        datain.get('sceneItemId'),
+    )
+
+# Outbound priority classes, highest first. Critical events are never shed, low priority ones are shed first
+PRIORITY_CRITICAL = 'critical'
+PRIORITY_NORMAL = 'normal'
+PRIORITY_LOW = 'low'
+PRIORITY_CLASSES = (PRIORITY_CRITICAL, PRIORITY_NORMAL, PRIORITY_LOW)
+
+# Events the bot reacts to, and high-volume events it can do without
+DEFAULT_CRITICAL_EVENTS = (
+    'StreamStateChanged', 'RecordStateChanged', 'CurrentProgramSceneChanged',
+    'ReplayBufferStateChanged', 'VirtualcamStateChanged',
+)
+DEFAULT_LOW_PRIORITY_EVENTS = (
+    'SceneItemTransformChanged', 'InputVolumeMeters', 'InputVolumeChanged', 'InputAudioBalanceChanged',
+    'InputActiveStateChanged', 'InputShowStateChanged', 'MediaInputPlaybackStarted', 'MediaInputPlaybackEnded',
+)
+
+# One bounded queue per priority class, get() takes from the highest class that has events waiting.
+# When a class is at its limit the oldest event of that class is shed, a limit of None never sheds
+class PriorityEventQueue:
+    def __init__(self, limits):
+        self.limits = dict(limits)
+        self.queues = {priority: collections.deque() for priority in PRIORITY_CLASSES}
+        self.shed = {priority: 0 for priority in PRIORITY_CLASSES}
+        self.ready = asyncio.Event()
+        self.closed = False
+
+    def qsize(self, priority=None):
+        if priority is not None:
+            return len(self.queues[priority])
+        return sum(len(queue) for queue in self.queues.values())
+
+    # Returns False when an event had to be shed to make room
+    def put(self, item, priority):
+        queue = self.queues[priority]
+        limit = self.limits.get(priority)
+        kept = True
+        if limit is not None and len(queue) >= limit:
+            queue.popleft()
+            self.shed[priority] += 1
+            kept = False
+        queue.append(item)
+        self.ready.set()
+        return kept
+
+    # After close() get() returns None once every class has been drained
+    def close(self):
+        self.closed = True
+        self.ready.set()
+
+    # (priority, item) of the next event, or None when nothing is queued
+    def get_nowait(self):
+        for priority in PRIORITY_CLASSES:
+            queue = self.queues[priority]
+            if queue:
+                return priority, queue.popleft()
+        return None
+
+    async def get(self):
+        while True:
+            entry = self.get_nowait()
+            if entry is not None or self.closed:
+                return entry
+            self.ready.clear()
+            await self.ready.wait()
+
+# Token bucket for SEND_OBS_EVENT deliveries, a rate of 0 or less turns the limit off
+class TokenBucket:
+    def __init__(self, rate=0, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def configure(self, rate, burst):
+        self.refill()
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = min(self.tokens, self.burst)
+
+    def refill(self):
+        now = time.monotonic()
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # Waits for a token, returns the seconds spent waiting or 0 when a token was available straight away
+    async def acquire(self):
+        if self.rate <= 0:
+            return 0
+        started = None
+        self.refill()
+        while self.tokens < 1:
+            if started is None:
+                started = time.monotonic()
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+            self.refill()
+        self.tokens -= 1
+        return 0 if started is None else time.monotonic() - started
+
+# Persistent forwarder that owns one event loop and one keep-alive session for the life of the app
+class SpecterEventForwarder:
+    def __init__(self, shutdown_timeout=10):
+        self.shutdown_timeout = shutdown_timeout
+        self.loop = None
+        self.queue = None
+        self.session = None
+        self.task = None
+        self.closing = False
+        self.started = threading.Event()
+        self.lock = threading.Lock()
+        # One event per request keeps SEND_OBS_EVENT's single object body, larger batches are sent as a JSON list
+        self.batch_max_events = 1
+        self.batch_max_delay = 0.25
+        self.queue_max_events = 1000
+        self.coalesce_window = 0.1
+        self.coalesce_events = frozenset(DEFAULT_COALESCE_EVENTS)
+        self.critical_events = frozenset(DEFAULT_CRITICAL_EVENTS)
+        self.low_priority_events = frozenset(DEFAULT_LOW_PRIORITY_EVENTS)
+        self.queue_max_low_events = 200
+        # Low priority events are shed on arrival while this many higher priority events are waiting
+        self.low_priority_shed_backlog = 200
+        self.rate_limiter = TokenBucket(50, 50)
+        # When each class last logged that it was shedding
+        self.shed_logged = {}
+        # Newest event per coalescing key and the timer that releases it
+        self.coalesce_pending = {}
+        # Number of events each coalescing key absorbed
+        self.coalesce_stats = {}
+        self.spool = None
+        self.spool_max_bytes = 50 * 1024 * 1024
+        self.spool_retry_interval = 5
+        self.send_lock = None
+        self.replay_wakeup = None
+        # Per-batch accounting, read by the UI and logs
+        self.stats = {
+            'batches_sent': 0, 'batches_failed': 0,
+            'events_sent': 0, 'events_failed': 0, 'events_dropped': 0, 'events_coalesced': 0,
+            'rate_limited': 0,
+        }
+
+    # Runs on the caller's event loop, must be called from that loop
+    def start_in_loop(self):
+        with self.lock:
+            if self.task is None:
+                self.setup()
+                self.task = self.loop.create_task(self.serve())
+
+    def load_batch_settings(self):
+        settings = load_settings()
+        self.batch_max_events = max(1, settings.getint('API', 'batch_max_events', fallback=1))
+        self.batch_max_delay = max(0, settings.getint('API', 'batch_max_delay_ms', fallback=250)) / 1000
+        self.queue_max_events = max(1, settings.getint('API', 'queue_max_events', fallback=1000))
+        self.coalesce_window = max(0, settings.getint('API', 'coalesce_window_ms', fallback=100)) / 1000
+        coalesce_events = settings.get('API', 'coalesce_events', fallback=','.join(DEFAULT_COALESCE_EVENTS))
+        self.coalesce_events = frozenset(name.strip() for name in coalesce_events.split(',') if name.strip())
+        critical_events = settings.get('API', 'critical_events', fallback=','.join(DEFAULT_CRITICAL_EVENTS))
+        self.critical_events = frozenset(name.strip() for name in critical_events.split(',') if name.strip())
+        low_priority_events = settings.get('API', 'low_priority_events', fallback=','.join(DEFAULT_LOW_PRIORITY_EVENTS))
+        self.low_priority_events = frozenset(name.strip() for name in low_priority_events.split(',') if name.strip())
+        self.queue_max_low_events = max(1, settings.getint('API', 'queue_max_low_events', fallback=200))
+        self.low_priority_shed_backlog = max(1, settings.getint('API', 'low_priority_shed_backlog', fallback=200))
+        self.rate_limiter.configure(settings.getfloat('API', 'rate_limit_per_second', fallback=50), settings.getint('API', 'rate_limit_burst', fallback=50))
+        self.spool_max_bytes = max(1, settings.getint('API', 'spool_max_mb', fallback=50)) * 1024 * 1024
+        self.spool_retry_interval = max(1, settings.getint('API', 'spool_retry_seconds', fallback=5))
+        if self.spool is not None:
+            self.spool.max_bytes = self.spool_max_bytes
+        if self.queue is not None:
+            self.queue.limits = self.queue_limits()
+
+    # Critical events are never shed, the other classes are bounded
+    def queue_limits(self):
+        return {PRIORITY_CRITICAL: None, PRIORITY_NORMAL: self.queue_max_events, PRIORITY_LOW: self.queue_max_low_events}
+
+    def event_priority(self, name):
+        if name in self.critical_events:
+            return PRIORITY_CRITICAL
+        if name in self.low_priority_events:
+            return PRIORITY_LOW
+        return PRIORITY_NORMAL
+
+    # Batching and coalescing limits follow the saved settings. Changes are notified on the thread that saved
+    # them, the limits are only touched on the forwarder loop
+    def on_settings_changed(self, config, changed):
+        if 'API' in changed and self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.reload_batch_settings)
+
+    def reload_batch_settings(self):
+        try:
+            self.load_batch_settings()
+        except ValueError as e:
+            logging.error(f"Invalid event batching settings, using defaults: {e}")
+
+    def setup(self):
+        self.loop = asyncio.get_running_loop()
+        self.reload_batch_settings()
+        self.queue = PriorityEventQueue(self.queue_limits())
+        self.send_lock = asyncio.Lock()
+        self.replay_wakeup = asyncio.Event()
+        try:
+            self.spool = EventSpool(spool_dir, max_bytes=self.spool_max_bytes)
+        except OSError as e:
+            logging.error(f"OBS event spool unavailable, failed events will not be kept: {e}")
+        settings_store.subscribe(self.on_settings_changed)
+        self.started.set()
+
+    async def serve(self):
+        replay_task = self.loop.create_task(self.replay_worker())
+        try:
+            await self.process_queue()
+        finally:
+            settings_store.unsubscribe(self.on_settings_changed)
+            replay_task.cancel()
+            await asyncio.gather(replay_task, return_exceptions=True)
+            if self.spool is not None:
+                self.spool_remaining()
+                self.spool.close()
+            await self.close_session()
+
+    # Called from the OBS receive loop, never blocks on the network.
+    # received is the perf_counter time the event arrived, used for the delivery latency
+    def submit(self, event, received=None):
+        if self.closing:
+            logging.info("Event forwarder is shutting down, OBS event dropped.")
+            return False
+        if not self.started.is_set():
+            self.start_in_loop()
+        self.enqueue(event, received)
+        return True
+
+    # Runs on the forwarder loop, high-frequency events wait in the coalescing window first
+    def enqueue(self, event, received=None):
+        if self.coalesce_window > 0:
+            name, datain = event_name_and_data(event)
+            if name in self.coalesce_events:
+                instance = event.get('instance') if isinstance(event, dict) else None
+                self.coalesce(coalesce_key(name, datain, instance), (event, received))
+                return
+        self.queue_event((event, received))
+
+    # Queue items are (event, received), when a class is full its oldest event makes room for the newest.
+    # Low priority events are shed straight away while higher priority events are backing up
+    def queue_event(self, item):
+        priority = self.event_priority(event_name_and_data(item[0])[0])
+        if priority == PRIORITY_LOW and self.queue.qsize(PRIORITY_CRITICAL) + self.queue.qsize(PRIORITY_NORMAL) >= self.low_priority_shed_backlog:
+            self.queue.shed[PRIORITY_LOW] += 1
+            self.note_shed(PRIORITY_LOW)
+        elif not self.queue.put(item, priority):
+            self.note_shed(priority)
+
+    # Shedding is logged at most every few seconds per class, the counts are in the metrics
+    def note_shed(self, priority):
+        self.stats['events_dropped'] += 1
+        now = time.monotonic()
+        if now - self.shed_logged.get(priority, 0) >= 5:
+            self.shed_logged[priority] = now
+            logging.error(f"Event forwarder is overloaded, shedding {priority} priority OBS events ({self.queue.shed[priority]} so far).")
+
+    # Keep only the newest event per key, it is queued when the key's window ends
+    def coalesce(self, key, item):
+        pending = self.coalesce_pending.get(key)
+        if pending is not None:
+            self.coalesce_pending[key] = (item, pending[1])
+            self.coalesce_stats[key] = self.coalesce_stats.get(key, 0) + 1
+            self.stats['events_coalesced'] += 1
+            return
+        timer = self.loop.call_later(self.coalesce_window, self.release_coalesced, key)
+        self.coalesce_pending[key] = (item, timer)
+
+    def release_coalesced(self, key):
+        item, timer = self.coalesce_pending.pop(key)
+        self.queue_event(item)
+
+    def release_all_coalesced(self):
+        for key in list(self.coalesce_pending):
+            self.coalesce_pending[key][1].cancel()
+            self.release_coalesced(key)
+
+    async def get_session(self):
+        import aiohttp
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=4, keepalive_timeout=60)
+            timeout = aiohttp.ClientTimeout(total=15)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self.session
+
+    async def close_session(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    # Collect events until the batch is full or the batch window has passed.
+    # A critical event closes the window, it goes out with whatever is already queued
+    async def collect_batch(self, first_entry):
+        priority, item = first_entry
+        batch = [item]
+        deadline = self.loop.time() + (0 if priority == PRIORITY_CRITICAL else self.batch_max_delay)
+        while len(batch) < self.batch_max_events:
+            entry = self.queue.get_nowait()
+            if entry is None:
+                remaining = deadline - self.loop.time()
+                if remaining <= 0 or self.queue.closed:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if entry is None:
+                    break
+            priority, item = entry
+            batch.append(item)
+            if priority == PRIORITY_CRITICAL:
+                deadline = self.loop.time()
+        return batch
+
+    # Returns False when the batch should be kept for a later retry
+    async def post_batch(self, events_data, received=()):
+        waited = await self.rate_limiter.acquire()
+        if waited:
+            self.stats['rate_limited'] += 1
+            metrics.observe("specter_rate_limit_wait_seconds", waited)
+        status = await deliver_obs_events(events_data, await self.get_session())
+        if status == 200:
+            self.stats['batches_sent'] += 1
+            self.stats['events_sent'] += len(events_data)
+            delivered = time.perf_counter()
+            for event_received in received:
+                if event_received is not None:
+                    metrics.observe("event_delivery_seconds", delivered - event_received)
+            return True
+        self.stats['batches_failed'] += 1
+        if is_retryable_status(status) and self.spool is not None:
+            return False
+        self.stats['events_failed'] += len(events_data)
+        return True
+
+    async def flush(self, batch):
+        events_data = []
+        received = []
+        for event, event_received in batch:
+            data = prepare_obs_event(event)
+            if data is not None:
+                events_data.append(data)
+                received.append(event_received)
+        if not events_data:
+            return
+        try:
+            # While older events are spooled, new ones go behind them to keep the order. replay_worker sends
+            # them on its own schedule, so intake never waits on a retry
+            if self.spool is not None and self.spool.has_pending():
+                self.spool.append(events_data)
+                return
+            async with self.send_lock:
+                if self.spool is not None and self.spool.has_pending():
+                    self.spool.append(events_data)
+                    return
+                try:
+                    posted = await self.post_batch(events_data, received)
+                except asyncio.CancelledError:
+                    # Stopped mid-send at the shutdown timeout, keep the batch for the next start
+                    if self.spool is not None:
+                        self.spool.append(events_data)
+                    raise
+                if not posted:
+                    self.spool.append(events_data)
+        except OSError as e:
+            self.stats['events_failed'] += len(events_data)
+            logging.error(f"Error writing OBS event spool: {e}")
+
+    # Whatever is still queued or coalescing when the forwarder stops early goes to the spool for the next start
+    def spool_remaining(self):
+        items = []
+        entry = self.queue.get_nowait()
+        while entry is not None:
+            items.append(entry[1])
+            entry = self.queue.get_nowait()
+        for item, timer in self.coalesce_pending.values():
+            timer.cancel()
+            items.append(item)
+        self.coalesce_pending.clear()
+        events_data = [data for data in (prepare_obs_event(event) for event, received in items) if data is not None]
+        if not events_data:
+            return 0
+        try:
+            self.spool.append(events_data)
+        except OSError as e:
+            self.stats['events_failed'] += len(events_data)
+            logging.error(f"Error writing OBS event spool, {len(events_data)} queued OBS events lost: {e}")
+            return 0
+        logging.info(f"{len(events_data)} queued OBS events spooled for the next start.")
+        return len(events_data)
+
+    # Send spooled events in order, stopping at the first batch that fails
+    async def replay_spool(self):
+        while self.spool.has_pending():
+            events_data = self.spool.peek(self.batch_max_events)
+            if events_data and not await self.post_batch(events_data):
+                return False
+            self.spool.commit()
+            self.spool.stats['events_replayed'] += len(events_data)
+        return True
+
+    async def replay_worker(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.replay_wakeup.wait(), self.spool_retry_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.replay_wakeup.clear()
+            if self.spool is None or not self.spool.has_pending():
+                continue
+            async with self.send_lock:
+                try:
+                    if await self.replay_spool():
+                        logging.info(f"OBS event spool replayed: {self.spool.stats}")
+                except OSError as e:
+                    logging.error(f"Error replaying OBS event spool: {e}")
+
+    # Try the spool straight away, for example once the Specter connection is back
+    def request_replay(self):
+        if self.started.is_set() and not self.closing:
+            self.loop.call_soon_threadsafe(self.replay_wakeup.set)
+
+    async def process_queue(self):
+        while True:
+            entry = await self.queue.get()
+            # None once the queue is closed and drained, everything queued before the stop has been sent
+            if entry is None:
+                break
+            await self.flush(await self.collect_batch(entry))
+        logging.info(f"Event forwarder stopped: {self.stats}")
+        if self.coalesce_stats:
+            logging.info(f"Most coalesced OBS events: {self.describe_coalesce_stats()}")
+
+    # The keys that absorbed the most events, e.g. "InputVolumeChanged Mic/Aux on main x412"
+    def describe_coalesce_stats(self, limit=5):
+        top = sorted(self.coalesce_stats.items(), key=lambda item: item[1], reverse=True)[:limit]
+        described = []
+        for (instance, name, scene, source, scene_item_id), count in top:
+            target = ' '.join(str(part) for part in (scene, source, scene_item_id) if part is not None)
+            label = f"{name} {target}" if target else name
+            if instance is not None:
+                label += f" on {instance}"
+            described.append(f"{label} x{count}")
+        return ', '.join(described)
+
+    # Stop accepting events and flush what is queued, returns False when there is nothing to stop
+    def request_stop(self):
+        with self.lock:
+            if self.closing:
+                return False
+            self.closing = True
+        if not self.started.is_set():
+            return False
+        self.loop.call_soon_threadsafe(self.release_all_coalesced)
+        self.loop.call_soon_threadsafe(self.queue.close)
+        return True
+
+    # Shutdown awaited on the forwarder loop
+    async def stop(self):
+        if not self.request_stop() or self.task is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(self.task), self.shutdown_timeout)
+        except asyncio.TimeoutError:
+            logging.error("Event forwarder did not drain pending OBS events before the shutdown timeout, spooling the rest.")
+            # Cancelling runs serve's cleanup, which spools the batch in flight and everything still queued
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    # Values for the metrics collector
+    def collect_metrics(self):
+        values = {f"forwarder_{name}": value for name, value in self.stats.items()}
+        values['forwarder_queue_depth'] = self.queue.qsize() if self.queue is not None else 0
+        if self.queue is not None:
+            for priority in PRIORITY_CLASSES:
+                values[f"forwarder_queue_depth_{priority}"] = self.queue.qsize(priority)
+                values[f"forwarder_shed_{priority}"] = self.queue.shed[priority]
+        values['forwarder_coalesce_pending'] = len(self.coalesce_pending)
+        if self.spool is not None:
+            values.update({f"spool_{name}": value for name, value in self.spool.stats.items()})
+            values['spool_bytes'] = self.spool.total_bytes
+        return values
+
+event_forwarder = SpecterEventForwarder()
+metrics.add_collector(event_forwarder.collect_metrics)
+
+# Capture files start with CAPTURE_MAGIC, then hold one record per OBS event: a 4-byte big-endian length and
+# the compact JSON array [nanoseconds since the capture started, instance, name, datain].
+# Files are written and read as a stream, names ending in .gz are gzip streams
+CAPTURE_MAGIC = b'SPECTER-OBS-CAPTURE 1\n'
+CAPTURE_LENGTH = struct.Struct('>I')
+
+def open_capture_file(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode)
+    return open(path, mode, buffering=64 * 1024)
+
+# Records every event on_event receives, memory use stays at the write buffer however long it runs
+class EventCapture:
+    def __init__(self, path, flush_interval=1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.file = None
+        self.started = None
+        self.last_flush = 0
+        self.events = 0
+        self.bytes = 0
+
+    def start(self):
+        self.file = open_capture_file(self.path, 'wb')
+        self.file.write(CAPTURE_MAGIC)
+        self.started = time.monotonic_ns()
+        self.last_flush = time.monotonic()
+        logging.info(f"Capturing OBS events to {self.path}")
+
+    def record(self, event, instance):
+        if self.file is None:
+            return
+        name, datain = event_name_and_data(event)
+        try:
+            data = encode_json([time.monotonic_ns() - self.started, instance, name, datain])
+            self.file.write(CAPTURE_LENGTH.pack(len(data)))
+            self.file.write(data)
+            self.events += 1
+            self.bytes += CAPTURE_LENGTH.size + len(data)
+            now = time.monotonic()
+            if now - self.last_flush >= self.flush_interval:
+                self.last_flush = now
+                self.file.flush()
+        except (OSError, TypeError, ValueError) as e:
+            logging.error(f"OBS event capture stopped: {e}")
+            self.stop()
+
+    def stop(self):
+        if self.file is None:
+            return
+        try:
+            self.file.close()
+        except OSError as e:
+            logging.error(f"Error closing OBS event capture: {e}")
+        self.file = None
+        logging.info(f"OBS event capture {self.path} closed: {self.events} events, {self.bytes} bytes")
+
+event_capture = None
+
+# strftime codes in the path are filled in, so each run can get its own file
+def start_event_capture(path):
+    global event_capture
+    stop_event_capture()
+    capture = EventCapture(os.path.expanduser(time.strftime(path)))
+    try:
+        capture.start()
+    except OSError as e:
+        logging.error(f"Could not start OBS event capture: {e}")
+        return None
+    event_capture = capture
+    return capture
+
+def stop_event_capture():
+    global event_capture
+    if event_capture is not None:
+        event_capture.stop()
+        event_capture = None
+
+# Yields (nanoseconds, instance, event) from a capture file one record at a time.
+# A record cut short at the end, as left by a crash, ends the stream
+def read_capture(path):
+    loads = orjson.loads if orjson is not None else json.loads
+    with open_capture_file(path, 'rb') as f:
+        if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(f"{path} is not an OBS event capture")
+        while True:
+            header = f.read(CAPTURE_LENGTH.size)
+            if len(header) < CAPTURE_LENGTH.size:
+                return
+            length, = CAPTURE_LENGTH.unpack(header)
+            data = f.read(length)
+            if len(data) < length:
+                logging.error(f"OBS event capture {path} ends with a partial record")
+                return
+            offset, instance, name, datain = loads(data)
+            yield offset, instance, {'name': name, 'datain': datain}
+
+# Feed a capture through on_event and the forwarder without OBS connected. speed is a multiple of the
+# captured pace, 0 replays as fast as the pipeline takes events. Returns throughput and latency figures
+async def replay_capture(path, speed=1.0, stop=None):
+    event_forwarder.start_in_loop()
+    started = time.perf_counter()
+    events = 0
+    try:
+        for offset, instance, event in read_capture(path):
+            if stop is not None and stop.is_set():
+                break
+            if speed > 0:
+                delay = started + offset / 1e9 / speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif events % 100 == 0:
+                # Let the forwarder send while the capture is read
+                await asyncio.sleep(0)
+            on_event(event, instance or DEFAULT_OBS_INSTANCE)
+            events += 1
+    finally:
+        fed = time.perf_counter() - started
+        await event_forwarder.stop()
+    elapsed = time.perf_counter() - started
+    snapshot = metrics.snapshot()
+    gauges, histograms = snapshot['gauges'], snapshot['histograms']
+    return {
+        'events': events,
+        'feed_seconds': fed,
+        'seconds': elapsed,
+        'events_per_second': gauges.get('forwarder_events_sent', 0) / elapsed if elapsed > 0 else 0,
+        'events_sent': gauges.get('forwarder_events_sent', 0),
+        'events_filtered': snapshot['counters'].get('obs_events_filtered_total', 0),
+        'events_coalesced': gauges.get('forwarder_events_coalesced', 0),
+        'events_failed': gauges.get('forwarder_events_failed', 0),
+        'events_shed': {priority: gauges.get(f"forwarder_shed_{priority}", 0) for priority in PRIORITY_CLASSES},
+        'events_spooled': gauges.get('spool_events_spooled', 0),
+        'latency': {name: histograms[name] for name in ('event_filter_seconds', 'event_delivery_seconds', 'specter_post_seconds') if name in histograms},
+    }
+
+# Handle OBS events and send them to Specter server
+def on_event(event, instance=DEFAULT_OBS_INSTANCE):
+    received = time.perf_counter()
+    metrics.inc("obs_events_received_total")
+    if event_capture is not None:
+        event_capture.record(event, instance)
+    name, datain = event_name_and_data(event)
+    get_obs_state(instance).apply_event(name, datain)
+    if isinstance(event, dict):
+        event['instance'] = instance
+    action = route_event_data(name, datain)
+    routed = time.perf_counter()
+    metrics.observe("event_filter_seconds", routed - received)
+    if action == ROUTE_FORWARD:
+        event_forwarder.submit(event, received)
+    else:
+        metrics.inc("obs_events_filtered_total")
+
+# Name and datain of an OBS event dict or an object with the same attributes
+def event_name_and_data(event):
+    if isinstance(event, dict):
+        name, datain = event.get('name'), event.get('datain')
+    else:
+        name, datain = getattr(event, 'name', None), getattr(event, 'datain', None)
+    if not isinstance(datain, dict):
+        datain = {}
+    return name, datain
+
+# Apply the filter rules to an OBS event and return the action taken
+def route_event_data(name, datain):
+    action = event_router.route(name, datain)
+    if action == ROUTE_LOG:
+        event_log.info(f"Event \"{name}\" filtered out and not sent: {datain}")
+    return action
+
+def custom_serializer(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+# SEND_OBS_EVENT body formats: the original form field, a plain JSON body, or JSON gzipped when large enough to gain
+PAYLOAD_FORM = 'form'
+PAYLOAD_JSON = 'json'
+PAYLOAD_GZIP = 'gzip'
+PAYLOAD_FORMATS = (PAYLOAD_FORM, PAYLOAD_JSON, PAYLOAD_GZIP)
+GZIP_MIN_BYTES = 1024
+
+# Compact UTF-8 JSON for one event or a batch
+def encode_events(events_data):
+    return encode_json(events_data[0] if len(events_data) == 1 else events_data)
+
+# orjson encodes datetimes itself and is used when installed
+def encode_json(body):
+    if orjson is not None:
+        try:
+            return orjson.dumps(body, default=custom_serializer)
+        except TypeError:
+            # Values orjson refuses, such as integers over 64 bits, still work with the stdlib encoder
+            pass
+    return json.dumps(body, separators=(',', ':'), ensure_ascii=False, default=custom_serializer).encode('utf-8')
+
+# Request body and headers for the encoded events
+def build_event_payload(encoded, payload_format=PAYLOAD_FORM):
+    if payload_format == PAYLOAD_GZIP and len(encoded) >= GZIP_MIN_BYTES:
+        return gzip.compress(encoded, compresslevel=5), {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}
+    if payload_format in (PAYLOAD_JSON, PAYLOAD_GZIP):
+        return encoded, {'Content-Type': 'application/json'}
+    return urllib.parse.urlencode({'data': encoded}).encode('ascii'), {'Content-Type': 'application/x-www-form-urlencoded'}
+
+def extract_event_data(event):
+    if isinstance(event, dict):
+        return event
+    elif hasattr(event, '__dict__'):
+        return vars(event)
+    return str(event)
+
+# Returns the event data to forward, or None when the event cannot be read
+def prepare_obs_event(event):
+    try:
+        return extract_event_data(event)
+    except Exception as e:
+        logging.info(f"Error sending OBS event to Specter: {e}")
+        return None
+
+# Statuses worth retrying later, anything else is a final answer from the API
+def is_retryable_status(status):
+    return status is None or status in (408, 429) or status >= 500
+
+# Send one or more events in a single SEND_OBS_EVENT request, a batch is posted as a JSON list in the payload_format body.
+# Returns the HTTP status, 0 when the payload could not be built or None when the API could not be reached
+async def post_obs_events_to_specter(events_data, session=None):
+    import aiohttp
+    try:
+        settings = load_settings()
+        API_TOKEN = settings['API'].get('apiKey')
+        payload_format = settings.get('API', 'payload_format', fallback=PAYLOAD_FORM).lower()
+        if payload_format not in PAYLOAD_FORMATS:
+            payload_format = PAYLOAD_FORM
+        serialize_started = time.perf_counter()
+        body, headers = build_event_payload(encode_events(events_data), payload_format)
+        metrics.observe("event_serialize_seconds", time.perf_counter() - serialize_started)
+    except Exception as e:
+        logging.info(f"Error sending OBS event to Specter: {e}")
+        return 0
+    # Without a shared session from the forwarder, fall back to a one-off session
+    owns_session = session is None
+    if owns_session:
+        session = aiohttp.ClientSession()
+    url = f"{specter_api_url('SEND_OBS_EVENT')}?api_key={API_TOKEN}"
+    try:
+        post_started = time.perf_counter()
+        async with session.post(url, data=body, headers=headers) as response:
+            metrics.observe("specter_post_seconds", time.perf_counter() - post_started)
+            metrics.inc(f"specter_post_{response.status // 100}xx_total")
+            if response.status == 200:
+                event_log.info(f"HTTPS event 'SEND_OBS_EVENT' sent successfully ({len(events_data)} events): {response.status}")
+            else:
+                response_text = await response.text()
+                event_log.error(f"Failed to send HTTPS event 'SEND_OBS_EVENT'. Status: {response.status} Response Body: {response_text}")
+            return response.status
+    except Exception as e:
+        metrics.inc("specter_post_errors_total")
+        event_log.error(f"Error forwarding event: {e}")
+        return None
+    finally:
+        if owns_session:
+            await session.close()
+
+# Event transports, socket emits over the Specter socket.io connection and falls back to HTTPS while it is down
+EVENT_TRANSPORT_HTTPS = 'https'
+EVENT_TRANSPORT_SOCKET = 'socket'
+
+# Emit events over the Specter socket and wait for the acknowledgement. The payload matches the HTTPS request,
+# the form field plus the api_key query parameter.
+# Returns 200 when acknowledged, 400 when the server rejects the events or None when the socket cannot deliver them
+async def emit_obs_events_to_specter(events_data, ack_timeout=5.0):
+    socket = specterSocket
+    if socket is None or not socket.connected:
+        return None
+    try:
+        serialize_started = time.perf_counter()
+        api_key = load_settings().get('API', 'apiKey', fallback='')
+        payload = {'api_key': api_key, 'data': encode_events(events_data).decode('utf-8')}
+        metrics.observe("event_serialize_seconds", time.perf_counter() - serialize_started)
+    except Exception as e:
+        logging.info(f"Error sending OBS event to Specter: {e}")
+        return 0
+    emit_started = time.perf_counter()
+    try:
+        ack = await socket.call('SEND_OBS_EVENT', payload, timeout=ack_timeout)
+    except Exception as e:
+        # Timeouts included: the events may have arrived, they are sent again over HTTPS rather than lost
+        metrics.inc("specter_emit_errors_total")
+        event_log.error(f"Socket event 'SEND_OBS_EVENT' was not acknowledged: {e or type(e).__name__}")
+        return None
+    metrics.observe("specter_emit_seconds", time.perf_counter() - emit_started)
+    if isinstance(ack, dict) and ack.get('status') == 'error':
+        metrics.inc("specter_emit_rejected_total")
+        event_log.error(f"Socket event 'SEND_OBS_EVENT' rejected: {ack}")
+        return 400
+    metrics.inc("specter_emit_acked_total")
+    event_log.info(f"Socket event 'SEND_OBS_EVENT' acknowledged ({len(events_data)} events): {ack}")
+    return 200
+
+# Send events with the configured transport, returns an HTTP style status like post_obs_events_to_specter
+async def deliver_obs_events(events_data, session=None):
+    settings = load_settings()
+    if settings.get('API', 'event_transport', fallback=EVENT_TRANSPORT_HTTPS).lower() == EVENT_TRANSPORT_SOCKET:
+        ack_timeout = max(100, settings.getint('API', 'socket_ack_timeout_ms', fallback=5000)) / 1000
+        status = await emit_obs_events_to_specter(events_data, ack_timeout)
+        if status is not None:
+            return status
+        metrics.inc("specter_emit_fallbacks_total")
+    return await post_obs_events_to_specter(events_data, session)
+
+# Status signals of the running Specter connection, set by specter_websocket
+specter_status = None
+
+# Handle successful registration or connection
+async def event_success(data):
+    logging.info(f"SpecterSocket Event: {data}")
+    if specter_status is not None:
+        specter_status.connection_status.emit(True)
+
+# Handle server errors or failure to connect
+async def event_failure(data):
+    logging.info(f"SpecterSocket Event: {data}")
+    if specter_status is not None:
+        specter_status.connection_status.emit(False)
+
+# Handle disconnection
+async def disconnect():
+    logging.info(f"SpecterSocket Event: Disconncted")
+    if specter_status is not None:
+        specter_status.connection_status.emit(False)
+
+# RequestBatch execution types
+OBS_BATCH_SERIAL = 0
+OBS_BATCH_PARALLEL = 2
+OBS_MEDIA_RESTART = 'OBS_WEBSOCKET_MEDIA_INPUT_ACTION_RESTART'
+
+# Command "instance" values that send a command to every connected OBS instance
+OBS_BROADCAST_INSTANCES = ('*', 'all')
+
+# Runs Specter commands against OBS, every command becomes one request or one RequestBatch per instance
+class OBSCommandExecutor:
+    def __init__(self):
+        self.clients = {}
+        self.actions = {
+            'switch_scene': self.switch_scene,
+            'toggle_source': self.toggle_source,
+            'toggle_filter': self.toggle_filter,
+            'set_text': self.set_text,
+            'restart_media': self.restart_media,
+        }
+        self.stats = {'commands_ok': 0, 'commands_failed': 0}
+        # End-to-end latency in milliseconds of the most recent commands
+        self.latencies = collections.deque(maxlen=100)
+
+    # Called when a connection is made or lost, the Specter and OBS connections share one loop
+    def attach(self, client, instance=DEFAULT_OBS_INSTANCE):
+        self.clients[instance] = client
+
+    def detach(self, client, instance=DEFAULT_OBS_INSTANCE):
+        if self.clients.get(instance) is client:
+            del self.clients[instance]
+
+    def require_client(self, instance=DEFAULT_OBS_INSTANCE):
+        client = self.clients.get(instance)
+        if client is None or not client.connected:
+            label = "OBS" if instance == DEFAULT_OBS_INSTANCE else f"OBS instance \"{instance}\""
+            raise OBSConnectionFailure(f"Not connected to {label}")
+        return client
+
+    # Instances a command goes to, the main one unless it names another or asks for all of them
+    def target_instances(self, data):
+        instance = data.get('instance') or DEFAULT_OBS_INSTANCE
+        if instance in OBS_BROADCAST_INSTANCES:
+            return [name for name, client in self.clients.items() if client.connected]
+        return [instance]
+
+    # Each action returns the list of (requestType, requestData) steps it needs
+    async def switch_scene(self, client, state, data):
+        return [('SetCurrentProgramScene', {'sceneName': data['sceneName']})]
+
+    # Scene item ids and current states come from the state cache, OBS is only asked on a cache miss
+    async def toggle_source(self, client, state, data):
+        scene_item_id = state.scene_item_id(data['sceneName'], data['sourceName'])
+        if scene_item_id is None:
+            item = await client.call('GetSceneItemId', {'sceneName': data['sceneName'], 'sourceName': data['sourceName']})
+            scene_item_id = item['sceneItemId']
+        enabled = data.get('enabled')
+        if enabled is None:
+            current = state.scene_item_enabled(data['sceneName'], scene_item_id)
+            if current is None:
+                current = (await client.call('GetSceneItemEnabled', {'sceneName': data['sceneName'], 'sceneItemId': scene_item_id}))['sceneItemEnabled']
+            enabled = not current
+        return [('SetSceneItemEnabled', {'sceneName': data['sceneName'], 'sceneItemId': scene_item_id, 'sceneItemEnabled': bool(enabled)})]
+
+    async def toggle_filter(self, client, state, data):
+        enabled = data.get('enabled')
+        if enabled is None:
+            current = state.filter_enabled(data['sourceName'], data['filterName'])
+            if current is None:
+                current = (await client.call('GetSourceFilter', {'sourceName': data['sourceName'], 'filterName': data['filterName']}))['filterEnabled']
+            enabled = not current
+        return [('SetSourceFilterEnabled', {'sourceName': data['sourceName'], 'filterName': data['filterName'], 'filterEnabled': bool(enabled)})]
+
+    async def set_text(self, client, state, data):
+        return [('SetInputSettings', {'inputName': data['sourceName'], 'inputSettings': {'text': str(data.get('text', ''))}, 'overlay': True})]
+
+    async def restart_media(self, client, state, data):
+        return [('TriggerMediaInputAction', {'inputName': data['sourceName'], 'mediaAction': OBS_MEDIA_RESTART})]
+
+    # A command is either one action or {"actions": [...], "execution": "serial" | "parallel"}
+    async def run_command(self, action, data, instance=DEFAULT_OBS_INSTANCE):
+        client = self.require_client(instance)
+        state = get_obs_state(instance)
+        steps_data = data.get('actions', []) if action == 'actions' else [dict(data, action=action)]
+        if not isinstance(steps_data, list):
+            raise ValueError(f"OBS command actions must be a list: {steps_data}")
+        for step in steps_data:
+            if not isinstance(step, dict):
+                raise ValueError(f"Invalid OBS command step: {step}")
+            if step.get('action') not in self.actions:
+                raise ValueError(f"Unknown OBS action \"{step.get('action')}\"")
+        built = await asyncio.gather(*(self.actions[step['action']](client, state, step) for step in steps_data))
+        steps = [request for requests in built for request in requests]
+        if not steps:
+            raise ValueError("OBS command has no actions")
+        if len(steps) == 1:
+            await client.call(*steps[0])
+            return
+        execution_type = OBS_BATCH_PARALLEL if data.get('execution') == 'parallel' else OBS_BATCH_SERIAL
+        results = await client.call_batch(steps, execution_type=execution_type, halt_on_failure=bool(data.get('haltOnFailure', False)))
+        for result in results:
+            status = result.get('requestStatus', {})
+            if not status.get('result'):
+                raise OBSRequestError(result.get('requestType'), status)
+
+    # Broadcast commands run on every connected instance at once, one failing does not stop the others
+    async def run_broadcast(self, action, data, instances):
+        if not instances:
+            raise OBSConnectionFailure("Not connected to any OBS instance")
+        outcomes = await asyncio.gather(*(self.run_command(action, data, instance) for instance in instances), return_exceptions=True)
+        results = {}
+        for instance, outcome in zip(instances, outcomes):
+            if isinstance(outcome, (OBSConnectionFailure, OBSRequestError, KeyError, ValueError)):
+                results[instance] = {'status': 'error', 'error': f"Missing command field {outcome}" if isinstance(outcome, KeyError) else str(outcome)}
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                results[instance] = {'status': 'ok'}
+        failed = [instance for instance, result in results.items() if result['status'] != 'ok']
+        if len(failed) == len(results):
+            raise OBSConnectionFailure("; ".join(f"{instance}: {results[instance]['error']}" for instance in failed))
+        return results
+
+    # Entry point for Specter socket handlers, the reply is sent back as the socket.io acknowledgement
+    async def handle(self, action, data):
+        received = time.perf_counter()
+        results = None
+        try:
+            if not isinstance(data, dict):
+                raise ValueError(f"Invalid command data: {data}")
+            if data.get('instance') in OBS_BROADCAST_INSTANCES:
+                results = await self.run_broadcast(action, data, self.target_instances(data))
+            else:
+                await self.run_command(action, data, data.get('instance') or DEFAULT_OBS_INSTANCE)
+        except (OBSConnectionFailure, OBSRequestError, KeyError, ValueError) as e:
+            error = f"Missing command field {e}" if isinstance(e, KeyError) else str(e)
+            self.stats['commands_failed'] += 1
+            command_log.error(f"OBS command \"{action}\" failed: {error}")
+            return {'status': 'error', 'error': error}
+        elapsed = time.perf_counter() - received
+        metrics.observe("obs_command_seconds", elapsed)
+        latency = elapsed * 1000
+        self.latencies.append(latency)
+        self.stats['commands_ok'] += 1
+        command_log.info(f"OBS command \"{action}\" completed in {latency:.1f} ms")
+        reply = {'status': 'ok', 'latency_ms': round(latency, 1)}
+        if results is not None:
+            reply['instances'] = results
+        return reply
+
+    def collect_metrics(self):
+        return {f"obs_{name}": value for name, value in self.stats.items()}
+
+obs_command_executor = OBSCommandExecutor()
+metrics.add_collector(obs_command_executor.collect_metrics)
+
+# Specter socket events that drive OBS
+SPECTER_OBS_COMMANDS = {
+    'OBS_SWITCH_SCENE': 'switch_scene',
+    'OBS_TOGGLE_SOURCE': 'toggle_source',
+    'OBS_TOGGLE_FILTER': 'toggle_filter',
+    'OBS_SET_TEXT': 'set_text',
+    'OBS_RESTART_MEDIA': 'restart_media',
+    'OBS_ACTIONS': 'actions',
+}
+
+def register_specter_command(socket, event_name, action):
+    async def handler(data):
+        command_log.info(f"SpecterSocket Event: {event_name} {data}")
+        return await obs_command_executor.handle(action, data)
+    socket.on(event_name, handler)
+
+# Create the Specter socket.io client and its handlers on first use
+def get_specter_socket():
+    global specterSocket
+    if specterSocket is None:
+        import socketio
+        # Reconnection is handled by specter_websocket so it shares the backoff with the OBS connection
+        specterSocket = socketio.AsyncClient(reconnection=False)
+        specterSocket.on('event_success', event_success)
+        specterSocket.on('event_failure', event_failure)
+        specterSocket.on('disconnect', disconnect)
+        for event_name, action in SPECTER_OBS_COMMANDS.items():
+            register_specter_command(specterSocket, event_name, action)
+        startup_timer.mark('network modules loaded')
+    return specterSocket
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def folded_stack(frame, root):
+    stack = []
+    while frame is not None:
+        stack.append(frame_label(frame))
+        frame = frame.f_back
+    stack.append(root)
+    return ';'.join(reversed(stack))
+
+# Leaf frames, as (file name, function), of threads that are blocked waiting rather than running:
+# the event loop's selector, lock and condition waits, queue reads and idle worker threads
+IDLE_FRAMES = frozenset({
+    ('selectors.py', 'select'), ('threading.py', 'wait'), ('threading.py', '_wait_for_tstate_lock'),
+    ('queue.py', 'get'), ('handlers.py', 'dequeue'), ('thread.py', '_worker'),
+})
+
+def is_idle_frame(frame):
+    code = frame.f_code
+    # A script with no Python frame above it is blocked in a native event loop, such as Qt's exec_()
+    if code.co_name == '<module>' and frame.f_back is None:
+        return True
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+# Samples the stack of every thread at a fixed interval from a thread of its own, so the connector loop is
+# profiled without being instrumented. Threads blocked in a wait are left out, so the samples show where the
+# CPU goes. Stacks are written in the folded format flame graph tools read.
+# The loop is pinged on every sample; while a ping goes unanswered for longer than stall_threshold a
+# callback is blocking it, and the loop thread's stack is kept as a stall
+class StackSampler:
+    def __init__(self, loop, interval=0.01, stall_threshold=0.1):
+        self.loop = loop
+        self.loop_thread = threading.get_ident()
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.stacks = collections.Counter()
+        self.stalls = collections.Counter()
+        # Samples per thread name in which the thread was running and blocked
+        self.busy = collections.Counter()
+        self.idle = collections.Counter()
+        self.samples = 0
+        self.ping_sent = None
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def pong(self):
+        self.ping_sent = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="DiagnosticsSampler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stopping.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                name = names.get(ident, str(ident))
+                if is_idle_frame(frame):
+                    self.idle[name] += 1
+                    continue
+                self.busy[name] += 1
+                self.stacks[folded_stack(frame, name)] += 1
+            self.samples += 1
+            now = time.monotonic()
+            if self.ping_sent is None:
+                self.ping_sent = now
+                try:
+                    self.loop.call_soon_threadsafe(self.pong)
+                except RuntimeError:
+                    # The loop closed while sampling
+                    return
+            elif now - self.ping_sent >= self.stall_threshold and self.loop_thread in frames:
+                self.stalls[folded_stack(frames[self.loop_thread], 'loop')] += 1
+
+    def write_folded(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    # Functions by samples spent in them (self) and under them (total), per thread
+    def write_top(self, path, limit=40):
+        own = collections.Counter()
+        total = collections.Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            thread = frames[0]
+            own[f"{thread}: {frames[-1]}"] += count
+            for frame in set(frames[1:]):
+                total[f"{thread}: {frame}"] += count
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"{self.samples} samples every {self.interval * 1000:g} ms, percentages are of all samples, blocked threads are left out\n")
+            f.write("\nBusy per thread\n")
+            for thread in sorted(set(self.busy) | set(self.idle), key=lambda name: -self.busy[name]):
+                f.write(f"{self.busy[thread]:>8} {100 * self.busy[thread] / max(1, self.samples):6.1f}%  {thread}\n")
+            for title, counter in (("Self", own), ("Total", total)):
+                f.write(f"\n{title}\n")
+                for frame, count in counter.most_common(limit):
+                    f.write(f"{count:>8} {100 * count / max(1, self.samples):6.1f}%  {frame}\n")
+
+    # Where the loop was while it was blocked, with roughly how long it was seen there
+    def describe_stalls(self, limit=10):
+        if not self.stalls:
+            return [f"No loop stalls over {self.stall_threshold * 1000:g} ms"]
+        lines = [f"Loop stalls over {self.stall_threshold * 1000:g} ms"]
+        for stack, count in self.stalls.most_common(limit):
+            lines.append(f"  about {count * self.interval * 1000:.0f} ms in:")
+            lines += [f"    {frame}" for frame in stack.split(';')[1:][-8:]]
+        return lines
+
+# Tasks on the loop with where each one is waiting, leaked tasks show up as long lists of the same coroutine
+def describe_tasks(loop=None):
+    lines = []
+    tasks = sorted(asyncio.all_tasks(loop), key=lambda task: task.get_name())
+    lines.append(f"{len(tasks)} tasks")
+    for task in tasks:
+        coro = task.get_coro()
+        lines.append(f"{task.get_name()}: {getattr(coro, '__qualname__', coro)}{' (done)' if task.done() else ''}")
+        for frame in task.get_stack(limit=4):
+            lines.append(f"    {frame.f_code.co_filename}:{frame.f_lineno} in {frame.f_code.co_name}")
+    return lines
+
+# aiohttp sessions that are still open, more than the forwarder's one points at a leak
+def describe_sessions():
+    aiohttp = sys.modules.get('aiohttp')
+    if aiohttp is None:
+        return ["aiohttp not loaded"]
+    sessions = [obj for obj in gc.get_objects() if isinstance(obj, aiohttp.ClientSession) and not obj.closed]
+    lines = [f"{len(sessions)} open aiohttp sessions"]
+    for session in sessions:
+        owner = " (event forwarder)" if session is event_forwarder.session else ""
+        lines.append(f"    {session!r}{owner}")
+    return lines
+
+def describe_loop_lag():
+    histogram = metrics.snapshot()['histograms'].get('event_loop_lag_seconds')
+    if histogram is None:
+        return ["Loop lag: no measurements"]
+    return [f"Loop lag: {histogram['count']} measurements, p50 {histogram['p50_ms']:.1f} ms, p99 {histogram['p99_ms']:.1f} ms, max {diagnostics.lag_max * 1000:.1f} ms"]
+
+# How late the loop wakes up from a sleep, anything over a few ms means a callback blocked it
+async def monitor_loop_lag(interval=0.25):
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - expected)
+        metrics.observe("event_loop_lag_seconds", lag)
+        diagnostics.lag_max = max(diagnostics.lag_max, lag)
+
+# On-demand CPU sampling, loop stall detection and tracemalloc for the running connector. start() and stop()
+# run on the connector loop, each run writes its reports to a directory of its own under diagnostics_dir
+class Diagnostics:
+    traceback_frames = 10
+
+    def __init__(self):
+        self.directory = None
+        self.sampler = None
+        self.start_snapshot = None
+        self.owns_tracemalloc = False
+        self.started = None
+        self.lag_max = 0.0
+
+    @property
+    def running(self):
+        return self.directory is not None
+
+    def start(self):
+        if self.running:
+            return self.directory
+        self.directory = os.path.join(diagnostics_dir, time.strftime('%Y%m%d-%H%M%S'))
+        os.makedirs(self.directory, exist_ok=True)
+        self.owns_tracemalloc = not tracemalloc.is_tracing()
+        if self.owns_tracemalloc:
+            tracemalloc.start(self.traceback_frames)
+        self.start_snapshot = tracemalloc.take_snapshot()
+        self.sampler = StackSampler(asyncio.get_running_loop())
+        self.sampler.start()
+        self.started = time.monotonic()
+        self.lag_max = 0.0
+        logging.info(f"Diagnostics started, reports go to {self.directory}")
+        return self.directory
+
+    # Returns the directory the reports were written to
+    async def stop(self):
+        if not self.running:
+            return None
+        loop = asyncio.get_running_loop()
+        directory, sampler, start_snapshot = self.directory, self.sampler, self.start_snapshot
+        self.directory = self.sampler = self.start_snapshot = None
+        duration = time.monotonic() - self.started
+        await loop.run_in_executor(None, sampler.stop)
+        end_snapshot = tracemalloc.take_snapshot()
+        if self.owns_tracemalloc:
+            tracemalloc.stop()
+        report = [f"{NAME} {VERSION}, diagnostics ran for {duration:.1f} s"] + describe_loop_lag() + sampler.describe_stalls()
+        report += describe_sessions() + [""] + describe_tasks()
+        await loop.run_in_executor(None, self.write_reports, directory, sampler, start_snapshot, end_snapshot, report)
+        logging.info(f"Diagnostics stopped, reports written to {directory}")
+        return directory
+
+    def write_reports(self, directory, sampler, start_snapshot, end_snapshot, report):
+        sampler.write_folded(os.path.join(directory, 'profile.folded'))
+        sampler.write_top(os.path.join(directory, 'profile-top.txt'))
+        # Allocations made during the run that are still alive, by the line that made them
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, '<frozen importlib._bootstrap>')]
+        stats = end_snapshot.filter_traces(filters).compare_to(start_snapshot.filter_traces(filters), 'lineno')
+        with open(os.path.join(directory, 'allocations.txt'), 'w', encoding='utf-8') as f:
+            f.write(f"Traced memory now {sum(stat.size for stat in stats) / 1024:.1f} KiB\n\nTop allocators since the start\n")
+            for stat in stats[:30]:
+                f.write(f"{stat}\n")
+        with open(os.path.join(directory, 'report.txt'), 'w', encoding='utf-8') as f:
+            f.write("\n".join(report) + "\n")
+
+    async def toggle(self):
+        if self.running:
+            return await self.stop()
+        return self.start()
+
+    # Task, session and loop lag listing without profiling, written next to the profiling runs
+    async def dump(self):
+        os.makedirs(diagnostics_dir, exist_ok=True)
+        path = os.path.join(diagnostics_dir, f"tasks-{time.strftime('%Y%m%d-%H%M%S')}.txt")
+        lines = describe_loop_lag() + describe_sessions() + [""] + describe_tasks()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        logging.info(f"Task listing written to {path}")
+        return path
+
+diagnostics = Diagnostics()
+
+# Serve the metrics in Prometheus text format when [METRICS] http_port is set, off by default
+async def start_metrics_server():
+    settings = load_settings()
+    try:
+        port = settings.getint('METRICS', 'http_port', fallback=0)
+    except ValueError as e:
+        logging.error(f"Invalid metrics settings: {e}")
+        return None
+    if not port:
+        return None
+    host = settings.get('METRICS', 'http_host', fallback='127.0.0.1')
+    from aiohttp import web
+    async def handle_metrics(request):
+        return web.Response(body=metrics.prometheus_text().encode('utf-8'), headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        logging.error(f"Metrics endpoint could not listen on {host}:{port}: {e}")
+        await runner.cleanup()
+        return None
+    logging.info(f"Metrics available at http://{host}:{port}/metrics")
+    return runner
+
+# Run both connections and the event forwarder on the current event loop until stop is set,
+# status carries the connection_status/obs_connection_status style signals for the front end
+async def run_connector(status, stop, capture_path=None):
+    loop = asyncio.get_running_loop()
+    capture_path = capture_path or load_settings().get('CAPTURE', 'path', fallback='')
+    if capture_path:
+        start_event_capture(capture_path)
+    event_forwarder.start_in_loop()
+    metrics_server = await start_metrics_server()
+    tasks = [
+        loop.create_task(specter_websocket(status)),
+        loop.create_task(obs_instances(status)),
+        loop.create_task(check_stored_api_key(status)),
+        loop.create_task(monitor_loop_lag()),
+    ]
+    await stop.wait()
+    logging.info("Shutting down")
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if specterSocket is not None and specterSocket.connected:
+        await specterSocket.disconnect()
+    await event_forwarder.stop()
+    stop_event_capture()
+    # A run still going at shutdown is written out rather than lost
+    if diagnostics.running:
+        await diagnostics.stop()
+    if metrics_server is not None:
+        await metrics_server.cleanup()
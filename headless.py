@@ -0,0 +1,67 @@
+import time
+startup_started = time.perf_counter()
+import sys
+import asyncio
+import logging
+import signal
+import argparse
+from connector import NAME, VERSION, startup_timer, run_connector, log_pipeline, diagnostics
+
+# Stand-in for a Qt signal, connection status goes to stdout and the log file
+class StatusLogger:
+    def __init__(self, label):
+        self.label = label
+
+    def emit(self, value):
+        if isinstance(value, bool):
+            logging.info(f"{self.label}: {'Connected' if value else 'Not Connected'}")
+        elif value:
+            logging.info(f"{self.label}: {value}")
+
+# Extra OBS instances report with their name first
+class InstanceStatusLogger:
+    def __init__(self, label):
+        self.label = label
+
+    def emit(self, instance, value):
+        StatusLogger(f"{self.label} ({instance})").emit(value)
+
+# Carries the same signal names as the GUI threads so the connection loops run unchanged
+class HeadlessStatus:
+    def __init__(self):
+        self.connection_status = StatusLogger("Specter WebSocket Connection")
+        self.connection_detail = StatusLogger("Specter WebSocket Connection")
+        self.obs_connection_status = StatusLogger("OBS WebSocket Connection")
+        self.obs_connection_detail = StatusLogger("OBS WebSocket Connection")
+        self.obs_instance_status = InstanceStatusLogger("OBS WebSocket Connection")
+        self.obs_instance_detail = InstanceStatusLogger("OBS WebSocket Connection")
+        self.api_key_status = StatusLogger("API Key")
+
+# Run the connector until SIGTERM or SIGINT
+async def run_headless(capture_path=None):
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except NotImplementedError:
+            # Windows event loops have no add_signal_handler
+            signal.signal(signum, lambda *args: loop.call_soon_threadsafe(stop.set))
+    # SIGUSR1 starts and stops a diagnostics run, SIGUSR2 writes a task listing. Neither exists on Windows
+    if hasattr(signal, 'SIGUSR1'):
+        loop.add_signal_handler(signal.SIGUSR1, lambda: loop.create_task(diagnostics.toggle()))
+        loop.add_signal_handler(signal.SIGUSR2, lambda: loop.create_task(diagnostics.dump()))
+    logging.info(f"{NAME} {VERSION} starting in headless mode")
+    await run_connector(HeadlessStatus(), stop, capture_path)
+    logging.info("Stopped")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=f"{NAME} without the window")
+    parser.add_argument('--capture', metavar='PATH', help="record every OBS event to this capture file, see replay.py")
+    args = parser.parse_args()
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    log_pipeline.add_handler(console)
+    startup_timer.start = startup_started
+    startup_timer.mark('imports')
+    asyncio.run(run_headless(args.capture))
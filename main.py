@@ -1,45 +1,36 @@
+import time
+startup_started = time.perf_counter()
 import sys
 import os
-import configparser
-import aiohttp
 import asyncio
-import json
 import logging
-from datetime import datetime
-from PyQt5.QtCore import Qt, pyqtSignal, QThread
+import threading
+from PyQt5.QtCore import Qt, pyqtSignal, QThread, QTimer
 from PyQt5.QtWidgets import (
     QWidget, QApplication, QMainWindow, QPushButton, QVBoxLayout, QFormLayout,
-    QLineEdit, QLabel, QStackedWidget, QHBoxLayout, QAction, QMessageBox, QTextEdit
+    QLineEdit, QLabel, QStackedWidget, QHBoxLayout, QAction, QMessageBox, QPlainTextEdit, QComboBox
 )
 from PyQt5.QtGui import QIcon, QColor, QTextCursor
-import socketio
-from socketio import AsyncClient as SocketClient
-import obswebsocket
-from obswebsocket import obsws
-from obswebsocket import requests as obsrequests
-
-# Paths for storage
-settings_dir = os.path.join(os.path.expanduser("~"), 'AppData', 'Local', 'YourStreamingTools', 'BotOfTheSpecter')
-os.makedirs(settings_dir, exist_ok=True)
-icon_path = os.path.join(settings_dir, 'app-icon.ico')
-settings_path = os.path.join(settings_dir, 'OBSConnectorSettings.ini')
-log_path = os.path.join(settings_dir, 'OBSConnectorLog.txt')
-
-# Configure logging
-logging.basicConfig(
-    filename=log_path,
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+from connector import (
+    NAME, VERSION, settings_dir, log_path, load_settings, save_settings, api_key_validator,
+    run_connector, startup_timer, LogTail, metrics, diagnostics
 )
 
-# Globals
-specterSocket = SocketClient()
-VERSION = "1.0"
-NAME = "BotOftheSpecter OBS Connector"
+icon_path = os.path.join(settings_dir, 'app-icon.ico')
+# Lines kept in the log viewer, older lines scroll out
+log_viewer_lines = 2000
+bundled_icon_path = os.path.join(getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__))), 'assets', 'icons', 'app-icon.ico')
+
+# Use the downloaded icon when present, otherwise the one bundled with the app
+def current_icon_path():
+    if os.path.exists(icon_path):
+        return icon_path
+    return bundled_icon_path
 
 # Download the icon file if it does not exist
 async def download_icon():
     if not os.path.exists(icon_path):
+        import aiohttp
         url = 'https://cdn.botofthespecter.com/app-builds/assets/icons/app-icon.ico'
         try:
             async with aiohttp.ClientSession() as session:
@@ -50,198 +41,20 @@ async def download_icon():
         except Exception as e:
             logging.info(f"Error downloading icon: {e}")
 
-# Run the icon download
-asyncio.run(download_icon())
-
-# Load settings from the INI file
-def load_settings():
-    config = configparser.ConfigParser()
-    if os.path.exists(settings_path):
-        config.read(settings_path)
-        if 'VERSION' in config:
-            stored_version = config['VERSION'].get('version', None)
-            if stored_version != VERSION:
-                api_settings = dict(config.items('API')) if 'API' in config else {}
-                obs_settings = dict(config.items('OBS')) if 'OBS' in config else {}
-                os.remove(settings_path)
-                config = configparser.ConfigParser()
-                config.add_section('VERSION')
-                config.set('VERSION', 'version', VERSION)
-                config.add_section('API')
-                for key, value in api_settings.items():
-                    config.set('API', key, value)
-                config.add_section('OBS')
-                for key, value in obs_settings.items():
-                    config.set('OBS', key, value)
-                with open(settings_path, 'w') as f:
-                    config.write(f)
-        else:
-            api_settings = dict(config.items('API')) if 'API' in config else {}
-            obs_settings = dict(config.items('OBS')) if 'OBS' in config else {}
-            os.remove(settings_path)
-            config = configparser.ConfigParser()
-            config.add_section('VERSION')
-            config.set('VERSION', 'version', VERSION)
-            config.add_section('API')
-            for key, value in api_settings.items():
-                config.set('API', key, value)
-            config.add_section('OBS')
-            for key, value in obs_settings.items():
-                config.set('OBS', key, value)
-            with open(settings_path, 'w') as f:
-                config.write(f)
-    else:
-        config.add_section('VERSION')
-        config.set('VERSION', 'version', VERSION)
-        config.add_section('API')
-        config.set('API', 'apiKey', '')
-        config.add_section('OBS')
-        config.set('OBS', 'server_ip', 'localhost')
-        config.set('OBS', 'server_port', '4455')
-        config.set('OBS', 'server_password', '')
-        with open(settings_path, 'w') as f:
-            config.write(f)
-    return config
-
-# Save settings to the INI file
-def save_settings(config):
-    with open(settings_path, 'w') as configfile:
-        config.write(configfile)
-
-# Get the settings for the OBS WebSocket Server
-async def obs_websocket_settings():
-    settings = load_settings()
-    server_ip = settings.get('OBS', 'server_ip', fallback='localhost')
-    server_port = settings.get('OBS', 'server_port', fallback='4455')
-    server_password = settings.get('OBS', 'server_password', fallback='')
-    return server_ip, server_port, server_password
-
-# API key validation function
-async def validate_api_key(api_key):
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get('https://api.botofthespecter.com/checkkey', params={'api_key': api_key}) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    logging.info(f"API Key Validation: {data}")
-                    return data.get('status') == 'Valid API Key'
-        return False
-    except aiohttp.exceptions.RequestException as e:
-        logging.error(f"API Key Validation Error: {e}")
-        return False
-
-# WebSocket connection event handler
-async def specter_websocket(specter_thread):
-    specter_websocket_uri = "wss://websocket.botofthespecter.com"
-    while True:
-        try:
-            await specterSocket.connect(specter_websocket_uri)
-            specter_thread.connection_status.emit(True)
-            await specterSocket.wait()
-        except socketio.exceptions.ConnectionError as ConnectionError:
-            logging.error(f"SpecterWebSocket ConnectionError Error: {ConnectionError}")
-            specter_thread.connection_status.emit(False)
-            await asyncio.sleep(10)
-        except Exception as e:
-            logging.error(f"SpecterWebSocket Error: {e}")
-            specter_thread.connection_status.emit(False)
-            await asyncio.sleep(10)
-
-# Function to connect to OBS WebSocket server
-async def obs_websocket(obs_thread):
-    cancellation_event = asyncio.Event()
-    while True:
-        try:
-            server_ip, server_port, server_password = await obs_websocket_settings()
-            obsSocket = obsws(server_ip, server_port, server_password)
-            obsSocket.connect()
-            obs_thread.obs_connection_status.emit(True)
-            obsSocket.register(on_event)
-            await cancellation_event.wait()
-            if cancellation_event.is_set():
-                break
-        except obswebsocket.exceptions.ConnectionFailure as ConnectionFailure:
-            logging.error(f"obsWebSocket ConnectionFailure: {ConnectionFailure}")
-            obs_thread.obs_connection_status.emit(False)
-            await asyncio.sleep(10)
-        except Exception as e:
-            logging.error(f"obsWebSocket Error: {e}")
-            obs_thread.obs_connection_status.emit(False)
-            await asyncio.sleep(10)
-        if obsSocket.connected:
-            obsSocket.disconnect()
-
-# Handle OBS events and send them to Specter server
-def on_event(event):
-    asyncio.run(send_obs_event_to_specter(event))
-
-async def send_obs_event_to_specter(event):
-    try:
-        def custom_serializer(obj):
-            if isinstance(obj, datetime):
-                return obj.isoformat()
-            raise TypeError(f"Type {type(obj)} not serializable")
-        def extract_event_data(event):
-            event_data = {}
-            if isinstance(event, dict):
-                event_data = event
-            elif hasattr(event, '__dict__'):
-                event_data = vars(event)
-            else:
-                event_data = str(event)
-            if (event_data.get("name") == "SceneItemEnableStateChanged" and isinstance(event_data.get("datain"), dict)):
-                datain = event_data["datain"]
-                if "sceneItemEnabled" in datain:
-                    return "SceneItemEnableStateChanged", None
-            return None, event_data
-        event_name, event_data = extract_event_data(event)
-        if event_data is None:
-            logging.info(f"Event \"{event_name}\" filtered out and not sent.")
-            return  # Skip sending request
-        API_TOKEN = load_settings()['API'].get('apiKey')
-        payload = {'data': json.dumps(event_data, default=custom_serializer)}
-        async with aiohttp.ClientSession() as session:
-            url = f'https://api.botofthespecter.com/SEND_OBS_EVENT?api_key={API_TOKEN}'
-            try:
-                form_data = aiohttp.FormData()
-                for key, value in payload.items():
-                    form_data.add_field(key, value)
-                async with session.post(url, data=form_data) as response:
-                    if response.status == 200:
-                        logging.info(f"HTTPS event 'SEND_OBS_EVENT' sent successfully: {response.status}")
-                    else:
-                        logging.info(f"Failed to send HTTPS event 'SEND_OBS_EVENT'. Status: {response.status}")
-                        response_text = await response.text()
-                        logging.info("Response Body:", response_text)
-            except Exception as e:
-                logging.info(f"Error forwarding event: {e}")
-    except Exception as e:
-        logging.info(f"Error sending OBS event to Specter: {e}")
-
-# Handle successful registration or connection
-@specterSocket.event
-async def event_success(data):
-    logging.info(f"SpecterSocket Event: {data}")
-    if hasattr(SpecterWebSocketThread, 'connection_status'):
-        SpecterWebSocketThread.connection_status.emit(True)
-
-# Handle server errors or failure to connect
-@specterSocket.event
-async def event_failure(data):
-    logging.info(f"SpecterSocket Event: {data}")
-    if hasattr(SpecterWebSocketThread, 'connection_status'):
-        SpecterWebSocketThread.connection_status.emit(False)
-
-# Handle disconnection
-@specterSocket.event
-async def disconnect():
-    logging.info(f"SpecterSocket Event: Disconncted")
-    if hasattr(SpecterWebSocketThread, 'connection_status'):
-        SpecterWebSocketThread.connection_status.emit(False)
+# Fetch the icon in the background so the window never waits on the network
+def start_icon_download(on_ready):
+    if os.path.exists(icon_path):
+        return
+    def run():
+        asyncio.run(download_icon())
+        if os.path.exists(icon_path):
+            on_ready(icon_path)
+    threading.Thread(target=run, name="IconDownload", daemon=True).start()
 
 # Settings Window
 class APISettingsPage(QWidget):
     api_key_saved = pyqtSignal()
+    validation_finished = pyqtSignal(str, object)
 
     def __init__(self, main_window):
         super().__init__()
@@ -255,9 +68,12 @@ class APISettingsPage(QWidget):
         settings = load_settings()
         api_key = settings['API'].get('apiKey', '') if 'API' in settings else ''
         self.api_key_input.setText(api_key)
-        save_button = QPushButton("Save API Key", self)
-        save_button.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold; padding: 10px; border-radius: 5px;")
-        save_button.clicked.connect(self.save_api_key)
+        self.api_key_input.textEdited.connect(self.cancel_validation)
+        self.validation = None
+        self.validation_finished.connect(self.on_validation_finished)
+        self.save_button = QPushButton("Save API Key", self)
+        self.save_button.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold; padding: 10px; border-radius: 5px;")
+        self.save_button.clicked.connect(self.save_api_key)
         self.error_label = QLabel("", self)
         self.error_label.setStyleSheet("color: red; font-size: 12px;")
         back_button = QPushButton("Back", self)
@@ -269,41 +85,62 @@ class APISettingsPage(QWidget):
         main_layout = QVBoxLayout()
         main_layout.addWidget(title_label)
         main_layout.addLayout(form_layout)
-        main_layout.addWidget(save_button)
+        main_layout.addWidget(self.save_button)
         main_layout.addWidget(back_button)
         self.setLayout(main_layout)
 
+    # Validation runs on the connector loop, the result comes back through validation_finished
     def save_api_key(self):
         api_key = self.api_key_input.text()
         settings = load_settings()
-        if settings:
-            try:
-                if api_key != settings['API'].get('apiKey', ''):
-                    if asyncio.run(validate_api_key(api_key)):
-                        settings.set('API', 'apiKey', api_key)
-                        save_settings(settings)
-                        self.error_label.setText("")
-                        self.api_key_saved.emit()
-                        self.main_window.show_main_page()
-                    else:
-                        self.error_label.setText("Invalid API Key. Please try again.")
-                else:
-                    self.error_label.setText("API Key is already set.")
-            except AttributeError:
-                if api_key != settings['API'].get('apikey', ''):
-                    if asyncio.run(validate_api_key(api_key)):
-                        settings.set('API', 'apiKey', api_key)
-                        save_settings(settings)
-                        self.error_label.setText("")
-                        self.api_key_saved.emit()
-                        self.main_window.show_main_page()
-                    else:
-                        self.error_label.setText("Invalid API Key. Please try again.")
-                else:
-                    self.error_label.setText("API Key is already set.")
+        if api_key == settings.get('API', 'apiKey', fallback=''):
+            self.show_status("API Key is already set.", error=True)
+            return
+        self.cancel_validation()
+        self.show_status("Checking API Key...")
+        self.save_button.setEnabled(False)
+        validation = self.main_window.connector_thread.submit(api_key_validator.check(api_key))
+        if validation is None:
+            self.save_button.setEnabled(True)
+            self.show_status("The connector is not running, please restart the app.", error=True)
+            return
+        self.validation = validation
+        validation.add_done_callback(lambda done: self.validation_finished.emit(api_key, done))
+
+    # Editing the key again drops the check that is still running for the old one
+    def cancel_validation(self):
+        if self.validation is not None:
+            self.validation.cancel()
+            self.validation = None
+            self.save_button.setEnabled(True)
+            self.show_status("")
+
+    def on_validation_finished(self, api_key, validation):
+        if validation is not self.validation or validation.cancelled():
+            return
+        self.validation = None
+        self.save_button.setEnabled(True)
+        try:
+            result = validation.result()
+        except Exception as e:
+            logging.error(f"API Key Validation Error: {e}")
+            result = None
+        if result is None:
+            self.show_status("Could not reach the Specter API. Please try again.", error=True)
+        elif result:
+            settings = load_settings()
+            settings.set('API', 'apiKey', api_key)
+            save_settings(settings)
+            self.show_status("")
+            self.api_key_saved.emit()
+            self.main_window.show_main_page()
         else:
-            self.error_label.setText("Failed to load settings.")
-    
+            self.show_status("Invalid API Key. Please try again.", error=True)
+
+    def show_status(self, text, error=False):
+        self.error_label.setStyleSheet(f"color: {'red' if error else '#AAAAAA'}; font-size: 12px;")
+        self.error_label.setText(text)
+
     def go_back(self):
         self.main_window.show_main_page()
 
@@ -359,41 +196,164 @@ class OBSSettingsPage(QWidget):
     def go_back(self):
         self.main_window.show_main_page()
 
-# Thread for running Specter websocket
-class SpecterWebSocketThread(QThread):
-    connection_status = pyqtSignal(bool)
-    def run(self):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        task = loop.create_task(specter_websocket(self))
-        try:
-            loop.run_until_complete(task)
-        except asyncio.CancelledError:
-            pass
-        finally:
-            loop.close()
+# Live pipeline metrics, refreshed every second while the page is shown
+class MetricsPage(QWidget):
+    # (label, histogram name) rows of the latency table
+    latency_rows = [
+        ("OBS event to Specter 200", 'event_delivery_seconds'),
+        ("Filter", 'event_filter_seconds'),
+        ("Serialize", 'event_serialize_seconds'),
+        ("SEND_OBS_EVENT POST", 'specter_post_seconds'),
+        ("SEND_OBS_EVENT socket ack", 'specter_emit_seconds'),
+        ("Rate limit wait", 'specter_rate_limit_wait_seconds'),
+        ("OBS command", 'obs_command_seconds'),
+        ("Specter connect", 'specter_connect_seconds'),
+        ("Specter reconnect", 'specter_reconnect_seconds'),
+        ("OBS connect", 'obs_connect_seconds'),
+        ("OBS reconnect", 'obs_reconnect_seconds'),
+        ("Event loop lag", 'event_loop_lag_seconds'),
+    ]
+
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        title_label = QLabel("Metrics", self)
+        title_label.setAlignment(Qt.AlignHCenter)
+        title_label.setStyleSheet("font-size: 20px; font-weight: bold; padding-bottom: 20px; color: #FFFFFF;")
+        self.metrics_label = QLabel("", self)
+        self.metrics_label.setStyleSheet("font-family: monospace; font-size: 12px; color: #FFFFFF;")
+        self.metrics_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        back_button = QPushButton("Back", self)
+        back_button.setStyleSheet("background-color: #007BFF; color: white; font-weight: bold; padding: 10px; border-radius: 5px;")
+        back_button.clicked.connect(self.go_back)
+        main_layout = QVBoxLayout()
+        main_layout.addWidget(title_label)
+        main_layout.addWidget(self.metrics_label)
+        main_layout.addStretch()
+        main_layout.addWidget(back_button)
+        self.setLayout(main_layout)
+        self.previous = None
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        self.refresh()
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        snapshot = metrics.snapshot()
+        counters, gauges, histograms = snapshot['counters'], snapshot['gauges'], snapshot['histograms']
+        received = counters.get('obs_events_received_total', 0)
+        sent = gauges.get('forwarder_events_sent', 0)
+        now = time.monotonic()
+        rate_in = rate_out = 0.0
+        if self.previous is not None:
+            elapsed = now - self.previous[0]
+            if elapsed > 0:
+                rate_in = (received - self.previous[1]) / elapsed
+                rate_out = (sent - self.previous[2]) / elapsed
+        self.previous = (now, received, sent)
+        lines = [
+            f"OBS events received  {received:>8}  {rate_in:7.1f}/s",
+            f"Forwarded            {sent:>8}  {rate_out:7.1f}/s",
+            f"Filtered             {counters.get('obs_events_filtered_total', 0):>8}",
+            f"Coalesced            {gauges.get('forwarder_events_coalesced', 0):>8}",
+            f"Failed               {gauges.get('forwarder_events_failed', 0):>8}",
+            f"Dropped (queue full) {gauges.get('forwarder_events_dropped', 0):>8}",
+            f"  shed critical/normal/low {gauges.get('forwarder_shed_critical', 0)}/{gauges.get('forwarder_shed_normal', 0)}/{gauges.get('forwarder_shed_low', 0)}",
+            f"Rate limited batches {gauges.get('forwarder_rate_limited', 0):>8}",
+            f"Spooled for retry    {gauges.get('spool_events_spooled', 0):>8}",
+            f"Replayed from spool  {gauges.get('spool_events_replayed', 0):>8}",
+            f"Queue depth          {gauges.get('forwarder_queue_depth', 0):>8}",
+            "",
+            f"{'Latency':<26}{'count':>7}{'p50 ms':>10}{'p99 ms':>10}",
+        ]
+        for label, name in self.latency_rows:
+            histogram = histograms.get(name)
+            if histogram is None:
+                continue
+            lines.append(f"{label:<26}{histogram['count']:>7}{histogram['p50_ms']:>10.1f}{histogram['p99_ms']:>10.1f}")
+        settings = load_settings()
+        port = settings.get('METRICS', 'http_port', fallback='0')
+        if port not in ('', '0'):
+            lines += ["", f"Prometheus: http://{settings.get('METRICS', 'http_host', fallback='127.0.0.1')}:{port}/metrics"]
+        self.metrics_label.setText("\n".join(lines))
 
-# Thread for running OBS websocket
-class OBSWebSocketThread(QThread):
+    def go_back(self):
+        self.main_window.show_main_page()
+
+# Single thread running one asyncio loop for the Specter and OBS connections and the event forwarder,
+# signals emitted from the loop are queued onto the GUI thread by Qt
+class ConnectorThread(QThread):
+    connection_status = pyqtSignal(bool)
+    connection_detail = pyqtSignal(str)
     obs_connection_status = pyqtSignal(bool)
+    obs_connection_detail = pyqtSignal(str)
+    # Extra OBS instances report with their name, the main instance uses the signals above
+    obs_instance_status = pyqtSignal(str, bool)
+    obs_instance_detail = pyqtSignal(str, str)
+    api_key_status = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        # Created up front so work can be submitted before the thread has started
+        self.loop = asyncio.new_event_loop()
+        # The stop event is made on the connector loop, before Python 3.10 it binds to the loop it is created on
+        self.stop_event = None
+        self.stop_requested = False
+
     def run(self):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        task = loop.create_task(obs_websocket(self))
+        asyncio.set_event_loop(self.loop)
         try:
-            loop.run_until_complete(task)
-        except asyncio.CancelledError:
-            pass
+            self.loop.run_until_complete(self.run_until_stopped())
         finally:
-            loop.close()
+            self.loop.close()
+
+    async def run_until_stopped(self):
+        self.stop_event = asyncio.Event()
+        if self.stop_requested:
+            self.stop_event.set()
+        await run_connector(self, self.stop_event)
+
+    # Runs on the connector loop, a stop asked for before run_until_stopped started is picked up by stop_requested
+    def request_stop(self):
+        self.stop_requested = True
+        if self.stop_event is not None:
+            self.stop_event.set()
+
+    # Schedule a coroutine on the connector loop from the GUI thread, returns a concurrent future
+    def submit(self, coro):
+        if self.loop.is_closed():
+            coro.close()
+            return None
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    # Thread-safe, asks the loop to shut down and waits for pending events to drain
+    def stop(self, timeout_ms=15000):
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.request_stop)
+        self.wait(timeout_ms)
 
 # MainWindow
 class MainWindow(QMainWindow):
+    icon_ready = pyqtSignal(str)
+    # Title and text of a finished diagnostics action, emitted from the connector loop
+    diagnostics_finished = pyqtSignal(str, str)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle(NAME)
         self.setGeometry(100, 100, 500, 250)
-        self.setWindowIcon(QIcon(icon_path))
+        self.setWindowIcon(QIcon(current_icon_path()))
+        self.icon_ready.connect(self.apply_icon)
+        self.diagnostics_finished.connect(self.show_diagnostics_result)
+        start_icon_download(self.icon_ready.emit)
         self.stack = QStackedWidget(self)
         self.setCentralWidget(self.stack)
         # Add menu bar
@@ -412,12 +372,26 @@ class MainWindow(QMainWindow):
         self.obs_connection_status_label = QLabel("OBS WebSocket Connection: Connecting", self)
         self.obs_connection_status_label.setAlignment(Qt.AlignCenter)
         self.obs_connection_status_label.setStyleSheet("font-size: 16px; color: #FF0000;")
-        # Group the connection status labels
-        status_layout = QVBoxLayout()
+        # Reconnect attempts and time to reconnect
+        self.connection_detail_label = QLabel("", self)
+        self.connection_detail_label.setAlignment(Qt.AlignCenter)
+        self.connection_detail_label.setStyleSheet("font-size: 12px; color: #AAAAAA;")
+        self.obs_connection_detail_label = QLabel("", self)
+        self.obs_connection_detail_label.setAlignment(Qt.AlignCenter)
+        self.obs_connection_detail_label.setStyleSheet("font-size: 12px; color: #AAAAAA;")
+        self.api_key_status_label = QLabel("", self)
+        self.api_key_status_label.setAlignment(Qt.AlignCenter)
+        self.api_key_status_label.setStyleSheet("font-size: 12px; color: #AAAAAA;")
+        # Group the connection status labels, labels for extra OBS instances are added as they report
+        self.obs_instance_labels = {}
+        self.status_layout = status_layout = QVBoxLayout()
         status_layout.setSpacing(0)
         status_layout.setAlignment(Qt.AlignCenter)
         status_layout.addWidget(self.connection_status_label)
+        status_layout.addWidget(self.connection_detail_label)
         status_layout.addWidget(self.obs_connection_status_label)
+        status_layout.addWidget(self.obs_connection_detail_label)
+        status_layout.addWidget(self.api_key_status_label)
         # Buttons layout
         button_layout = QHBoxLayout()
         api_key_button = QPushButton("API Key", self)
@@ -437,16 +411,22 @@ class MainWindow(QMainWindow):
         # Settings pages
         self.settings_page = APISettingsPage(self)
         self.settings_page.api_key_saved.connect(self.show_main_page)
+        self.settings_page.api_key_saved.connect(lambda: self.update_api_key_status("Valid"))
         self.stack.addWidget(self.settings_page)
         self.obs_settings_page = OBSSettingsPage(self)
         self.stack.addWidget(self.obs_settings_page)
-        # Start separate threads for each WebSocket connection
-        self.specter_thread = SpecterWebSocketThread()
-        self.specter_thread.connection_status.connect(self.update_connection_status)
-        self.specter_thread.start()
-        self.obs_thread = OBSWebSocketThread()
-        self.obs_thread.obs_connection_status.connect(self.update_obs_connection_status)
-        self.obs_thread.start()
+        self.metrics_page = MetricsPage(self)
+        self.stack.addWidget(self.metrics_page)
+        # Start the connector thread that runs both WebSocket connections
+        self.connector_thread = ConnectorThread()
+        self.connector_thread.connection_status.connect(self.update_connection_status)
+        self.connector_thread.connection_detail.connect(self.connection_detail_label.setText)
+        self.connector_thread.obs_connection_status.connect(self.update_obs_connection_status)
+        self.connector_thread.obs_connection_detail.connect(self.obs_connection_detail_label.setText)
+        self.connector_thread.obs_instance_status.connect(self.update_obs_instance_status)
+        self.connector_thread.obs_instance_detail.connect(self.update_obs_instance_detail)
+        self.connector_thread.api_key_status.connect(self.update_api_key_status)
+        self.connector_thread.start()
         # Load settings and display the appropriate page
         settings = load_settings()
         if not settings.get('API', 'apiKey'):
@@ -504,6 +484,17 @@ class MainWindow(QMainWindow):
         logs_action = QAction("Logs", self)
         logs_action.triggered.connect(self.show_logs)
         view_menu.addAction(logs_action)
+        metrics_action = QAction("Metrics", self)
+        metrics_action.triggered.connect(self.show_metrics_page)
+        view_menu.addAction(metrics_action)
+        # Diagnostics menu
+        diagnostics_menu = menu_bar.addMenu("Diagnostics")
+        self.profiling_action = QAction("Start Profiling", self)
+        self.profiling_action.triggered.connect(self.toggle_profiling)
+        dump_tasks_action = QAction("Dump Tasks", self)
+        dump_tasks_action.triggered.connect(self.dump_tasks)
+        diagnostics_menu.addAction(self.profiling_action)
+        diagnostics_menu.addAction(dump_tasks_action)
         # Help menu
         help_menu = menu_bar.addMenu("Help")
         about_action = QAction("About", self)
@@ -517,29 +508,96 @@ class MainWindow(QMainWindow):
         if not hasattr(self, 'log_window') or self.log_window is None:
             self.log_window = QWidget()
             log_layout = QVBoxLayout()
-            self.log_text_edit = QTextEdit(self)
+            filter_layout = QHBoxLayout()
+            self.log_level_filter = QComboBox(self)
+            self.log_level_filter.addItems(["All", "INFO", "WARNING", "ERROR"])
+            self.log_level_filter.currentIndexChanged.connect(self.load_logs)
+            self.log_text_filter = QLineEdit(self)
+            self.log_text_filter.setPlaceholderText("Filter")
+            self.log_text_filter.setStyleSheet("background-color: #555555; color: #FFFFFF; padding: 5px; border-radius: 5px;")
+            self.log_text_filter.returnPressed.connect(self.load_logs)
+            filter_layout.addWidget(self.log_level_filter)
+            filter_layout.addWidget(self.log_text_filter)
+            log_layout.addLayout(filter_layout)
+            self.log_text_edit = QPlainTextEdit(self)
             self.log_text_edit.setReadOnly(True)
+            self.log_text_edit.setMaximumBlockCount(log_viewer_lines)
             self.log_text_edit.setStyleSheet("color: #FFFFFF; background-color: #333333; border: none;")
             log_layout.addWidget(self.log_text_edit)
             refresh_button = QPushButton("Refresh Logs", self)
-            refresh_button.clicked.connect(lambda: self.load_logs(self.log_text_edit))
+            refresh_button.clicked.connect(self.load_logs)
             log_layout.addWidget(refresh_button)
             self.log_window.setLayout(log_layout)
             self.log_window.setWindowTitle(f"{NAME} - Logs")
             self.log_window.resize(600, 400)
-            self.log_window.setWindowIcon(QIcon(icon_path))
-        self.load_logs(self.log_text_edit)
+            self.log_window.setWindowIcon(QIcon(current_icon_path()))
+            self.log_tail = LogTail(log_path, max_lines=log_viewer_lines)
+            # New lines are picked up by offset while the window is open
+            self.log_timer = QTimer(self)
+            self.log_timer.setInterval(500)
+            self.log_timer.timeout.connect(self.follow_logs)
+        self.load_logs()
         self.log_window.show()
+        self.log_timer.start()
 
-    def load_logs(self, log_text_edit):
+    # Show the last lines that match the filters, read backwards from the end of the file
+    def load_logs(self):
+        level = self.log_level_filter.currentText()
+        self.log_tail.set_filter(None if level == "All" else level, self.log_text_filter.text())
         try:
-            with open(log_path, "r") as log_file:
-                log_content = log_file.read()
-                log_text_edit.setPlainText(log_content)
-                log_text_edit.moveCursor(QTextCursor.End)
+            lines = self.log_tail.tail()
         except Exception as e:
             logging.info(f"Error in loading logs: {e}")
             QMessageBox.information(self, f"{NAME} - Logs", f"Error loading log file: {e}")
+            return
+        self.log_text_edit.setPlainText("\n".join(lines))
+        self.log_text_edit.moveCursor(QTextCursor.End)
+
+    def follow_logs(self):
+        if not self.log_window.isVisible():
+            self.log_timer.stop()
+            return
+        try:
+            lines, replace = self.log_tail.follow()
+        except OSError:
+            # The file may be mid-rotation, try again on the next tick
+            return
+        if replace:
+            self.log_text_edit.clear()
+        if not lines:
+            return
+        scroll_bar = self.log_text_edit.verticalScrollBar()
+        at_bottom = scroll_bar.value() == scroll_bar.maximum()
+        self.log_text_edit.appendPlainText("\n".join(lines))
+        if at_bottom:
+            scroll_bar.setValue(scroll_bar.maximum())
+
+    # Diagnostics run on the connector loop, the result comes back through diagnostics_finished
+    def run_diagnostics(self, coro, title):
+        def done(future):
+            try:
+                self.diagnostics_finished.emit(title, str(future.result()))
+            except Exception as e:
+                self.diagnostics_finished.emit(title, f"Failed: {e}")
+        future = self.connector_thread.submit(coro)
+        if future is not None:
+            future.add_done_callback(done)
+
+    def toggle_profiling(self):
+        if diagnostics.running:
+            self.profiling_action.setText("Start Profiling")
+            self.run_diagnostics(diagnostics.stop(), "Profiling stopped")
+        else:
+            self.profiling_action.setText("Stop Profiling")
+            self.run_diagnostics(diagnostics.toggle(), "Profiling started")
+
+    def dump_tasks(self):
+        self.run_diagnostics(diagnostics.dump(), "Task listing")
+
+    def show_diagnostics_result(self, title, text):
+        if text.startswith("Failed"):
+            self.profiling_action.setText("Stop Profiling" if diagnostics.running else "Start Profiling")
+        QMessageBox.information(self, f"{NAME} - {title}", f"{title}: {text}")
 
     def open_user_guide(self):
         QMessageBox.information(self, "User Guide", "Open the user guide or documentation.")
@@ -548,7 +606,7 @@ class MainWindow(QMainWindow):
         if not hasattr(self, 'about_window') or self.about_window is None:
             self.about_window = QWidget()
             about_layout = QVBoxLayout()
-            label_text = f"{NAME}\nVersion {VERSION}\nDeveloped by: gfaUnDead"
+            label_text = f"{NAME}\nVersion {VERSION}\nDeveloped by: gfaUnDead\n{startup_timer.report()}"
             about_text = QLabel(label_text, self)
             about_text.setStyleSheet("color: #FFFFFF; background-color: #333333; font-size: 16px; padding: 10px;")
             about_layout.addWidget(about_text)
@@ -559,15 +617,30 @@ class MainWindow(QMainWindow):
             self.about_window.setLayout(about_layout)
             self.about_window.setWindowTitle(f"{NAME} - About")
             self.about_window.resize(400, 200)
-            self.about_window.setWindowIcon(QIcon(icon_path))
+            self.about_window.setWindowIcon(QIcon(current_icon_path()))
         self.about_window.show()
 
+    # Swap in the downloaded icon once the background fetch finishes
+    def apply_icon(self, path):
+        icon = QIcon(path)
+        self.setWindowIcon(icon)
+        for window in (getattr(self, 'log_window', None), getattr(self, 'about_window', None)):
+            if window is not None:
+                window.setWindowIcon(icon)
+
+    def closeEvent(self, event):
+        self.connector_thread.stop()
+        super().closeEvent(event)
+
     def show_api_key_page(self):
         self.stack.setCurrentWidget(self.settings_page)
 
     def show_obs_settings_page(self):
         self.stack.setCurrentWidget(self.obs_settings_page)
 
+    def show_metrics_page(self):
+        self.stack.setCurrentWidget(self.metrics_page)
+
     def show_main_page(self):
         self.stack.setCurrentWidget(self.main_page)
 
@@ -579,6 +652,9 @@ class MainWindow(QMainWindow):
             self.connection_status_label.setText("Specter WebSocket Connection: Not Connected")
             self.connection_status_label.setStyleSheet("font-size: 16px; color: #FF0000;")
 
+    def update_api_key_status(self, status):
+        self.api_key_status_label.setText(f"API Key: {status}")
+
     def update_obs_connection_status(self, connected):
         if connected:
             self.obs_connection_status_label.setText("OBS WebSocket Connection: Connected")
@@ -587,7 +663,43 @@ class MainWindow(QMainWindow):
             self.obs_connection_status_label.setText("OBS WebSocket Connection: Not Connected")
             self.obs_connection_status_label.setStyleSheet("font-size: 16px; color: #FF0000;")
 
+    # Status and detail labels for an extra OBS instance, placed after the main instance's labels
+    def obs_instance_label_pair(self, instance):
+        labels = self.obs_instance_labels.get(instance)
+        if labels is None:
+            status_label = QLabel(f"OBS WebSocket Connection ({instance}): Connecting", self)
+            status_label.setAlignment(Qt.AlignCenter)
+            status_label.setStyleSheet("font-size: 16px; color: #FF0000;")
+            detail_label = QLabel("", self)
+            detail_label.setAlignment(Qt.AlignCenter)
+            detail_label.setStyleSheet("font-size: 12px; color: #AAAAAA;")
+            index = self.status_layout.indexOf(self.api_key_status_label)
+            self.status_layout.insertWidget(index, status_label)
+            self.status_layout.insertWidget(index + 1, detail_label)
+            labels = self.obs_instance_labels[instance] = (status_label, detail_label)
+        return labels
+
+    def update_obs_instance_status(self, instance, connected):
+        status_label = self.obs_instance_label_pair(instance)[0]
+        if connected:
+            status_label.setText(f"OBS WebSocket Connection ({instance}): Connected")
+            status_label.setStyleSheet("font-size: 16px; color: #00FF00;")
+        else:
+            status_label.setText(f"OBS WebSocket Connection ({instance}): Not Connected")
+            status_label.setStyleSheet("font-size: 16px; color: #FF0000;")
+
+    # An instance whose settings section was deleted reports "Removed" and loses its labels
+    def update_obs_instance_detail(self, instance, detail):
+        if detail == "Removed":
+            for label in self.obs_instance_labels.pop(instance, ()):
+                self.status_layout.removeWidget(label)
+                label.deleteLater()
+            return
+        self.obs_instance_label_pair(instance)[1].setText(detail)
+
 if __name__ == "__main__":
+    startup_timer.start = startup_started
+    startup_timer.mark('imports')
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
     palette = app.palette()
@@ -598,5 +710,9 @@ if __name__ == "__main__":
     palette.setColor(palette.ToolTipBase, QColor("#FFFFFF"))
     palette.setColor(palette.ToolTipText, QColor("#000000"))
     app.setPalette(palette)
-    MainWindow().show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    main_window = MainWindow()
+    main_window.show()
+    startup_timer.mark('UI ready')
+    exit_code = app.exec_()
+    main_window.connector_thread.stop()
+    sys.exit(exit_code)
\ No newline at end of file
@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import configparser
+import json
+import logging
+import os
+import shutil
+import signal
+import sys
+import tempfile
+
+# Replays an OBS event capture through the connector's filtering and forwarding pipeline without OBS.
+# Captures are recorded with headless.py --capture or the [CAPTURE] path setting
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay an OBS event capture through the forwarding pipeline")
+    parser.add_argument('capture', help="capture file, .gz captures are read as gzip streams")
+    parser.add_argument('--speed', type=float, default=1.0, help="multiple of the captured pace, 0 for as fast as possible")
+    # Replays never reach the production API by accident, the target has to be named
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--api-url', help="send to this Specter API, e.g. benchmarks/fakes.py")
+    target.add_argument('--live', action='store_true', help="send to the Specter API in your settings with your API key")
+    parser.add_argument('--api-key', default='replay', help="API key used with --api-url")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    return parser.parse_args()
+
+# API, filter and rule sections of the settings the connector normally runs with
+def copy_user_settings(connector, settings, source_dir):
+    stored = configparser.ConfigParser()
+    stored.read(os.path.join(source_dir, os.path.basename(connector.settings_path)))
+    for name in stored.sections():
+        if name in ('API', 'FILTERS') or name.startswith('RULE '):
+            if name not in settings:
+                settings.add_section(name)
+            for key, value in stored.items(name):
+                settings.set(name, key, value)
+
+def print_results(results):
+    print(f"Events replayed         {results['events']:,}")
+    print(f"Events forwarded        {results['events_sent']:,}")
+    print(f"Events filtered         {results['events_filtered']:,}")
+    print(f"Events coalesced        {results['events_coalesced']:,}")
+    print(f"Events failed           {results['events_failed']:,}")
+    print(f"Events spooled          {results['events_spooled']:,}")
+    for priority, shed in results['events_shed'].items():
+        print(f"Shed {priority:<19}{shed:,}")
+    print(f"Time                    {results['seconds']:.2f} s ({results['feed_seconds']:.2f} s feeding)")
+    print(f"Throughput              {results['events_per_second']:,.1f} events/s")
+    for name, histogram in results['latency'].items():
+        print(f"{name:<24}p50 {histogram['p50_ms']:.2f} ms, p99 {histogram['p99_ms']:.2f} ms")
+
+async def replay(connector, args):
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    try:
+        loop.add_signal_handler(signal.SIGINT, stop.set)
+    except NotImplementedError:
+        pass
+    return await connector.replay_capture(args.capture, args.speed, stop)
+
+def main():
+    args = parse_args()
+    source_dir = os.environ.get('SPECTER_OBS_CONNECTOR_DIR')
+    # Replays always get a settings directory of their own, so events that fail are never spooled into
+    # the running connector's spool and re-sent by it later
+    replay_dir = tempfile.mkdtemp(prefix='specter-replay-')
+    os.environ['SPECTER_OBS_CONNECTOR_DIR'] = replay_dir
+    try:
+        run_replay(args, source_dir)
+    finally:
+        connector = sys.modules.get('connector')
+        if connector is not None:
+            # The log file is held open by the pipeline until it stops
+            connector.log_pipeline.stop()
+            connector.log_pipeline.file_handler.close()
+        shutil.rmtree(replay_dir, ignore_errors=True)
+
+def run_replay(args, source_dir):
+    import connector
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    connector.log_pipeline.add_handler(console)
+    settings = connector.load_settings()
+    if args.live:
+        copy_user_settings(connector, settings, source_dir or connector.user_settings_dir)
+    else:
+        settings.set('API', 'apiKey', args.api_key)
+        settings.set('API', 'api_url', args.api_url)
+    # The Specter socket is not connected during a replay
+    settings.set('API', 'event_transport', connector.EVENT_TRANSPORT_HTTPS)
+    settings.set('LOGGING', 'events', 'WARNING')
+    connector.save_settings(settings)
+    try:
+        results = asyncio.run(replay(connector, args))
+    except (OSError, ValueError) as e:
+        print(f"Could not replay {args.capture}: {e}")
+        sys.exit(1)
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import configparser
+import os
+import sys
+import tempfile
+import unittest
+
+# The connector keeps its settings and log under this directory instead of the user's
+os.environ.setdefault('SPECTER_OBS_CONNECTOR_DIR', tempfile.mkdtemp(prefix='specter-test-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from connector import EventRouter, OBS_HIGH_VOLUME_EVENTS, ROUTE_DROP, ROUTE_FORWARD, ROUTE_LOG, parse_rule_conditions
+
+def make_router(sections):
+    config = configparser.ConfigParser()
+    config.read_dict(sections)
+    router = EventRouter()
+    router.load(config)
+    return router
+
+class ParseRuleConditionsTest(unittest.TestCase):
+    def test_condition_forms(self):
+        self.assertEqual(parse_rule_conditions("outputActive; !outputPath; outputState == OBS_WEBSOCKET_OUTPUT_STARTED; sceneName != Intro"), (
+            ('outputActive', 'exists', None),
+            ('outputPath', 'missing', None),
+            ('outputState', '==', 'OBS_WEBSOCKET_OUTPUT_STARTED'),
+            ('sceneName', '!=', 'Intro'),
+        ))
+
+    def test_empty_parts_ignored(self):
+        self.assertEqual(parse_rule_conditions(""), ())
+        self.assertEqual(parse_rule_conditions(" ; a ;"), (('a', 'exists', None),))
+
+    # Only the first operator splits, the rest belongs to the value
+    def test_value_keeps_later_operators(self):
+        self.assertEqual(parse_rule_conditions("inputName == a==b"), (('inputName', '==', 'a==b'),))
+
+class EventRouterRouteTest(unittest.TestCase):
+    def test_first_matching_rule_wins(self):
+        router = make_router({
+            'RULE hide-intro': {'events': 'CurrentProgramSceneChanged', 'when': 'sceneName == Intro', 'action': 'drop'},
+            'RULE scenes': {'events': 'CurrentProgramSceneChanged', 'action': 'log'},
+        })
+        self.assertEqual(router.route('CurrentProgramSceneChanged', {'sceneName': 'Intro'}), ROUTE_DROP)
+        self.assertEqual(router.route('CurrentProgramSceneChanged', {'sceneName': 'Game'}), ROUTE_LOG)
+
+    def test_default_action_when_no_rule_matches(self):
+        router = make_router({
+            'FILTERS': {'default_action': 'drop'},
+            'RULE stream': {'events': 'StreamStateChanged', 'when': 'outputActive == true', 'action': 'forward'},
+        })
+        self.assertEqual(router.route('StreamStateChanged', {'outputActive': True}), ROUTE_FORWARD)
+        self.assertEqual(router.route('StreamStateChanged', {'outputActive': False}), ROUTE_DROP)
+        self.assertEqual(router.route('RecordStateChanged', {'outputActive': True}), ROUTE_DROP)
+
+    # Wildcard rules keep their place in the file order among the named rules
+    def test_wildcard_rules_in_file_order(self):
+        router = make_router({
+            'RULE everything': {'events': '*', 'when': 'inputName == Mic', 'action': 'drop'},
+            'RULE volume': {'events': 'InputVolumeChanged', 'action': 'log'},
+        })
+        self.assertEqual(router.route('InputVolumeChanged', {'inputName': 'Mic'}), ROUTE_DROP)
+        self.assertEqual(router.route('InputVolumeChanged', {'inputName': 'Music'}), ROUTE_LOG)
+        self.assertEqual(router.route('InputMuteStateChanged', {'inputName': 'Mic'}), ROUTE_DROP)
+        self.assertEqual(router.route('InputMuteStateChanged', {'inputName': 'Music'}), ROUTE_FORWARD)
+
+    def test_default_rules_without_rule_sections(self):
+        router = make_router({})
+        self.assertEqual(router.route('SceneItemEnableStateChanged', {'sceneItemEnabled': False}), ROUTE_LOG)
+        self.assertEqual(router.route('SceneItemEnableStateChanged', {}), ROUTE_FORWARD)
+
+    def test_unknown_action_skips_rule(self):
+        with self.assertLogs(level='ERROR'):
+            router = make_router({'RULE typo': {'events': 'StreamStateChanged', 'action': 'forwrad'}})
+        self.assertEqual(router.route('StreamStateChanged', {}), ROUTE_FORWARD)
+
+class BuildSubscriptionsTest(unittest.TestCase):
+    def test_only_deliverable_categories(self):
+        router = make_router({
+            'FILTERS': {'default_action': 'drop'},
+            'RULE stream': {'events': 'StreamStateChanged', 'action': 'forward'},
+        })
+        self.assertEqual(router.get_subscriptions(), 1 << 6)
+
+    # A conditional drop can still let events through, so the category stays subscribed
+    def test_conditional_drop_keeps_category(self):
+        router = make_router({
+            'FILTERS': {'default_action': 'drop'},
+            'RULE stream': {'events': 'StreamStateChanged', 'when': 'outputActive', 'action': 'drop'},
+            'RULE stream-rest': {'events': 'StreamStateChanged', 'action': 'log'},
+        })
+        self.assertEqual(router.get_subscriptions(), 1 << 6)
+
+    def test_unconditional_drop_removes_category(self):
+        router = make_router({'RULE vendor': {'events': 'VendorEvent', 'action': 'drop'}})
+        subscriptions = router.get_subscriptions()
+        self.assertFalse(subscriptions & (1 << 9))
+        self.assertTrue(subscriptions & (1 << 6))
+
+    def test_high_volume_events_only_when_named(self):
+        self.assertFalse(make_router({}).get_subscriptions() & sum(OBS_HIGH_VOLUME_EVENTS.values()))
+        router = make_router({'RULE meters': {'events': 'InputVolumeMeters', 'action': 'forward'}})
+        subscriptions = router.get_subscriptions()
+        self.assertTrue(subscriptions & OBS_HIGH_VOLUME_EVENTS['InputVolumeMeters'])
+        self.assertFalse(subscriptions & OBS_HIGH_VOLUME_EVENTS['InputShowStateChanged'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# The connector keeps its settings and log under this directory instead of the user's
+os.environ.setdefault('SPECTER_OBS_CONNECTOR_DIR', tempfile.mkdtemp(prefix='specter-test-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from connector import EventSpool
+
+class EventSpoolTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.spools = []
+
+    def tearDown(self):
+        for spool in self.spools:
+            spool.close()
+        self.directory.cleanup()
+
+    def open_spool(self, **kwargs):
+        spool = EventSpool(self.directory.name, fsync_interval=0, **kwargs)
+        self.spools.append(spool)
+        return spool
+
+    def events(self, first, count):
+        return [{'name': 'StreamStateChanged', 'datain': {'sequence': sequence}} for sequence in range(first, first + count)]
+
+    def sequences(self, events):
+        return [event['datain']['sequence'] for event in events]
+
+    def test_append_peek_commit(self):
+        spool = self.open_spool()
+        self.assertFalse(spool.has_pending())
+        spool.append(self.events(0, 5))
+        self.assertTrue(spool.has_pending())
+        self.assertEqual(self.sequences(spool.peek(3)), [0, 1, 2])
+        spool.commit()
+        self.assertEqual(self.sequences(spool.peek(10)), [3, 4])
+        spool.commit()
+        self.assertFalse(spool.has_pending())
+        self.assertEqual(spool.peek(10), [])
+
+    # Events stay in the spool until commit, a failed replay sends the same events again
+    def test_peek_without_commit_repeats(self):
+        spool = self.open_spool()
+        spool.append(self.events(0, 3))
+        self.assertEqual(self.sequences(spool.peek(2)), [0, 1])
+        self.assertEqual(self.sequences(spool.peek(2)), [0, 1])
+
+    def test_restart_resumes_after_committed_events(self):
+        spool = self.open_spool()
+        spool.append(self.events(0, 4))
+        spool.peek(2)
+        spool.commit()
+        spool.append(self.events(4, 2))
+        spool.close()
+        reopened = self.open_spool()
+        self.assertTrue(reopened.has_pending())
+        self.assertEqual(self.sequences(reopened.peek(10)), [2, 3, 4, 5])
+
+    # A write cut short by a crash leaves a partial line, it is skipped once the segment is finished
+    def test_restart_skips_partial_line(self):
+        spool = self.open_spool()
+        spool.append(self.events(0, 2))
+        spool.close()
+        with open(spool.segment_path(spool.segments[-1]), 'ab') as f:
+            f.write(b'{"name": "Str')
+        reopened = self.open_spool()
+        reopened.append(self.events(2, 1))
+        self.assertEqual(self.sequences(reopened.peek(10)), [0, 1])
+        reopened.commit()
+        self.assertEqual(self.sequences(reopened.peek(10)), [2])
+
+    def test_oldest_segments_evicted_over_limit(self):
+        spool = self.open_spool(max_bytes=2000, segment_max_bytes=500)
+        for first in range(0, 100, 10):
+            spool.append(self.events(first, 10))
+        self.assertLessEqual(spool.total_bytes, 2000)
+        self.assertGreater(spool.stats['segments_evicted'], 0)
+        remaining = []
+        while spool.has_pending():
+            remaining += self.sequences(spool.peek(50))
+            spool.commit()
+        # The newest events survive, in order
+        self.assertEqual(remaining, list(range(100 - len(remaining), 100)))
+        self.assertLess(len(remaining), 100)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# The connector keeps its settings and log under this directory instead of the user's
+os.environ.setdefault('SPECTER_OBS_CONNECTOR_DIR', tempfile.mkdtemp(prefix='specter-test-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from connector import LogTail
+
+class LogTailTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def write(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    # An unfinished last line longer than a block is left for follow(), not an IndexError
+    def test_long_unfinished_last_line(self):
+        self.write(b'2020 - INFO - a\n' + b'x' * 70000)
+        tail = LogTail(self.path)
+        self.assertEqual(tail.tail(), ['2020 - INFO - a'])
+        with open(self.path, 'ab') as f:
+            f.write(b'\n')
+        self.assertEqual(tail.follow(), (['x' * 70000], False))
+
+    def test_file_without_newline(self):
+        self.write(b'x' * 70000)
+        self.assertEqual(LogTail(self.path).tail(), [])
+
+    def test_long_line_in_the_middle(self):
+        self.write(b'2020 - INFO - a\n' + b'y' * 200000 + b'\n2020 - INFO - z\n')
+        self.assertEqual(LogTail(self.path, max_lines=2).tail(), ['y' * 200000, '2020 - INFO - z'])
+
+if __name__ == '__main__':
+    unittest.main()
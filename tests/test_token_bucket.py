@@ -0,0 +1,33 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+
+# The connector keeps its settings and log under this directory instead of the user's
+os.environ.setdefault('SPECTER_OBS_CONNECTOR_DIR', tempfile.mkdtemp(prefix='specter-test-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from connector import TokenBucket
+
+class TokenBucketTest(unittest.TestCase):
+    # A token that is already there is not a wait, or every batch would count as rate limited
+    def test_available_token_reports_no_wait(self):
+        bucket = TokenBucket(50, 50)
+        waits = asyncio.run(self.acquire(bucket, 50))
+        self.assertEqual(waits, [0] * 50)
+
+    def test_empty_bucket_waits(self):
+        bucket = TokenBucket(100, 1)
+        waits = asyncio.run(self.acquire(bucket, 2))
+        self.assertEqual(waits[0], 0)
+        self.assertGreater(waits[1], 0)
+
+    def test_no_limit(self):
+        bucket = TokenBucket(0, 1)
+        self.assertEqual(asyncio.run(self.acquire(bucket, 100)), [0] * 100)
+
+    async def acquire(self, bucket, count):
+        return [await bucket.acquire() for _ in range(count)]
+
+if __name__ == '__main__':
+    unittest.main()